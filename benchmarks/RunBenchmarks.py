@@ -0,0 +1,157 @@
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+repo_path = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(repo_path))
+sys.path.insert(0, str(repo_path / 'projects' / 'NBAStatsWebsite'))
+sys.path.insert(0, str(repo_path / 'projects' / 'MiscProjects'))
+
+from lib.DataGather import Stat, IdIndex, LeagueGameLogs, GameList, Game
+from lib.HttpSession import ArchivedResponse, set_session
+from lib.ResponseCache import ResponseCache, set_cache
+from lib.RequestScheduler import RequestScheduler, set_scheduler
+from ManageSiteData import TechnicalEffects, PlayerConsistencyInfo
+from GameSim import simulate_games
+import SyntheticPayloads
+
+
+default_baseline_path = Path(__file__).resolve().parent / 'baseline.json'
+
+
+class SyntheticSession:
+    """Session that answers player game log requests with synthetic payloads, serialized once per player"""
+
+    def __init__(self):
+        self.bodies = {}
+
+    def get(self, url, params=None, **kwargs):
+        player_id = params['PlayerID']
+        if player_id not in self.bodies:
+            self.bodies[player_id] = json.dumps(SyntheticPayloads.player_game_log(player_id))
+        return ArchivedResponse(url, 200, self.bodies[player_id])
+
+
+def measure(func, repeat):
+    """Time a benchmark and record its peak memory
+
+    :param func: The benchmark body -- called repeat times for timing, then once more under tracemalloc
+    :param repeat: How many timed runs to take the best of
+    :return: (best time in seconds, peak memory in bytes)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def build_benchmarks():
+    """Set up every benchmark's inputs
+
+    :return: A list of (name, items processed per run, function)
+    """
+    player_log = SyntheticPayloads.league_game_log('P')
+    team_log = SyntheticPayloads.league_game_log('T')
+    play_by_play = SyntheticPayloads.play_by_play('0021500001', events=450, techs=4)
+
+    player_log_stat = LeagueGameLogs(lazy=True)
+    team_games = GameList(lazy=True).load(team_log).games
+    game = Game('0021500001', lazy=True).load(play_by_play)
+    tech_effects = TechnicalEffects.__new__(TechnicalEffects)
+
+    player_index = IdIndex.players()
+    player_index.refresh()
+    player_names = player_index.names + [' '.join(reversed(name.split(', '))) for name in player_index.names]
+    consistency_players = [{'DISPLAY_LAST_COMMA_FIRST': name, 'TEAM_CODE': 'warriors'}
+                           for name in player_index.names[:200]]
+
+    matchup_table = {'tov': [0.13, 0.14], 'ft_trip': [0.1, 0.11], 'three_share': [0.28, 0.3], 'fg2': [0.5, 0.48],
+                     'fg3': [0.36, 0.34], 'oreb': [0.23, 0.24], 'ft': [0.77, 0.75], 'possessions': 98.0}
+
+    def consistency():
+        for player in consistency_players:
+            PlayerConsistencyInfo.create_json_object(player, [])
+
+    return [
+        ('Stat.zip_data_as_list (leaguegamelog P)', len(player_log['resultSets'][0]['rowSet']),
+         lambda: player_log_stat.load(player_log)),
+        ('Stat.zip_data_as_list (playbyplayv2)', len(play_by_play['resultSets'][0]['rowSet']),
+         lambda: Game('0021500001', lazy=True).load(play_by_play)),
+        ('Stat.get_id_from_player (playerlist.txt)', len(player_names),
+         lambda: [Stat.get_id_from_player(name) for name in player_names]),
+        ('GameList.remove_duplicates (leaguegamelog T)', len(team_games),
+         lambda: GameList.remove_duplicates(team_games)),
+        ('Game.tech_list (playbyplayv2)', len(game.list[0]), lambda: game.tech_list),
+        ('TechnicalEffects.get_plays_after_tech (all techs)', len(game.tech_list),
+         lambda: tech_effects.get_all_tech_runs(game)),
+        ('PlayerConsistencyInfo.create_json_object', len(consistency_players), consistency),
+        ('GameSim.simulate_games (possessions)', 10000 * 98 * 2, lambda: simulate_games(matchup_table, 10000, seed=0)),
+    ]
+
+
+def run(repeat):
+    results = {}
+    for name, items, func in build_benchmarks():
+        seconds, peak = measure(func, repeat)
+        results[name] = {'seconds': seconds, 'items_per_second': items / seconds if seconds else None,
+                         'peak_kib': peak / 1024, 'items': items}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print results next to the baseline
+
+    :return: The names of benchmarks that got slower than the baseline by more than tolerance
+    """
+    regressions = []
+    print('{:<52} {:>12} {:>14} {:>12} {:>10}'.format('benchmark', 'seconds', 'items/s', 'peak KiB', 'vs base'))
+    for name, result in results.items():
+        change = ''
+        if name in baseline:
+            ratio = result['seconds'] / baseline[name]['seconds']
+            change = '{:+.1%}'.format(ratio - 1)
+            if ratio > 1 + tolerance:
+                regressions.append(name)
+                change += ' !'
+        print('{:<52} {:>12.6f} {:>14.0f} {:>12.1f} {:>10}'.format(name, result['seconds'], result['items_per_second'],
+                                                                   result['peak_kib'], change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark parsing, ID lookup and site-data jobs offline')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per benchmark, best one is kept')
+    parser.add_argument('--baseline', default=str(default_baseline_path), help='baseline file to compare against')
+    parser.add_argument('--save', action='store_true', help='save these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='slowdown that counts as a regression')
+    args = parser.parse_args()
+
+    set_cache(ResponseCache())
+    set_session(SyntheticSession())
+    set_scheduler(RequestScheduler(rate=None))
+    results = run(args.repeat)
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    regressions = compare(results, baseline, args.tolerance)
+    if args.save:
+        baseline_path.write_text(json.dumps(results, indent=4, sort_keys=True))
+        print('Saved baseline to {}'.format(baseline_path))
+    if regressions:
+        print('Slower than baseline: {}'.format(', '.join(regressions)))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import random
+from datetime import date, timedelta
+
+
+PLAY_BY_PLAY_HEADERS = ['GAME_ID', 'EVENTNUM', 'EVENTMSGTYPE', 'EVENTMSGACTIONTYPE', 'PERIOD', 'WCTIMESTRING',
+                        'PCTIMESTRING', 'HOMEDESCRIPTION', 'NEUTRALDESCRIPTION', 'VISITORDESCRIPTION', 'SCORE',
+                        'SCOREMARGIN', 'PERSON1TYPE', 'PLAYER1_ID', 'PLAYER1_NAME', 'PLAYER1_TEAM_ID',
+                        'PLAYER1_TEAM_CITY', 'PLAYER1_TEAM_NICKNAME', 'PLAYER1_TEAM_ABBREVIATION', 'PERSON2TYPE',
+                        'PLAYER2_ID', 'PLAYER2_NAME', 'PLAYER2_TEAM_ID', 'PLAYER2_TEAM_CITY', 'PLAYER2_TEAM_NICKNAME',
+                        'PLAYER2_TEAM_ABBREVIATION', 'PERSON3TYPE', 'PLAYER3_ID', 'PLAYER3_NAME', 'PLAYER3_TEAM_ID',
+                        'PLAYER3_TEAM_CITY', 'PLAYER3_TEAM_NICKNAME', 'PLAYER3_TEAM_ABBREVIATION',
+                        'VIDEO_AVAILABLE_FLAG']
+
+GAME_LOG_HEADERS = ['SEASON_ID', 'PLAYER_ID', 'PLAYER_NAME', 'TEAM_ID', 'TEAM_ABBREVIATION', 'TEAM_NAME', 'GAME_ID',
+                    'GAME_DATE', 'MATCHUP', 'WL', 'MIN', 'FGM', 'FGA', 'FG_PCT', 'FG3M', 'FG3A', 'FG3_PCT', 'FTM',
+                    'FTA', 'FT_PCT', 'OREB', 'DREB', 'REB', 'AST', 'STL', 'BLK', 'TOV', 'PF', 'PTS', 'PLUS_MINUS',
+                    'VIDEO_AVAILABLE']
+
+TEAMS = ['ATL', 'BOS', 'BKN', 'CHA', 'CHI', 'CLE', 'DAL', 'DEN', 'DET', 'GSW', 'HOU', 'IND', 'LAC', 'LAL', 'MEM',
+         'MIA', 'MIL', 'MIN', 'NOP', 'NYK', 'OKC', 'ORL', 'PHI', 'PHX', 'POR', 'SAC', 'SAS', 'TOR', 'UTA', 'WAS']
+
+
+def play_by_play(game_id, events=450, techs=4, seed=0):
+    """A playbyplayv2 response with `events` plays and `techs` technical fouls spread through the game"""
+    rng = random.Random(seed)
+    home, away = TEAMS[seed % 30], TEAMS[(seed + 7) % 30]
+    tech_events = set(rng.sample(range(10, events - 10), techs))
+    rows, home_score, away_score = [], 0, 0
+    for eventnum in range(events):
+        per_period = -(-events // 4)
+        period = 1 + eventnum // per_period
+        remaining = 720 - (eventnum % per_period) * 720 // per_period
+        clock = '{}:{:02d}'.format(remaining // 60, remaining % 60)
+        is_home = rng.random() < 0.5
+        if eventnum in tech_events:
+            description, msg_type, action = 'Player T.FOUL (P1.PN), (K. Referee)', 6, 11
+        else:
+            msg_type = rng.choice([1, 2, 4, 5, 6, 8])
+            action = 1
+            description = {1: 'Player 18\' Jump Shot (2 PTS)', 2: 'MISS Player 3PT Jump Shot', 4: 'Player REBOUND',
+                           5: 'Player Bad Pass Turnover (P1.T1)', 6: 'Player P.FOUL (P1.T1)',
+                           8: 'SUB: Player FOR Other'}[msg_type]
+        score = margin = None
+        if msg_type == 1:
+            if is_home:
+                home_score += 2
+            else:
+                away_score += 2
+            score = '{} - {}'.format(away_score, home_score)
+            margin = 'TIE' if home_score == away_score else str(home_score - away_score)
+        team = home if is_home else away
+        rows.append([game_id, eventnum, msg_type, action, period, '7:{:02d} PM'.format(eventnum % 60), clock,
+                     description if is_home else None, None, None if is_home else description, score, margin, 4,
+                     200000 + eventnum, 'Player', 1610612700, 'City', 'Team', team, 0, 0, None, None, None, None, None,
+                     0, 0, None, None, None, None, None, 1])
+    return {'resource': 'playbyplay', 'parameters': {'GameID': game_id},
+            'resultSets': [{'name': 'PlayByPlay', 'headers': PLAY_BY_PLAY_HEADERS, 'rowSet': rows},
+                           {'name': 'AvailableVideo', 'headers': ['VIDEO_AVAILABLE_FLAG'], 'rowSet': [[1]]}]}
+
+
+def game_log_row(rng, player_id, game_number, team, opponent):
+    fgm, fga = rng.randint(0, 12), rng.randint(12, 24)
+    ftm, reb, ast = rng.randint(0, 8), rng.randint(0, 15), rng.randint(0, 12)
+    game_date = date(2015, 10, 27) + timedelta(days=game_number * 2)
+    return ['22015', player_id, 'Player {}'.format(player_id), 1610612700, team, 'Team', '00215{:05d}'.format(
+        game_number * 15 + TEAMS.index(team) // 2), game_date.strftime('%Y-%m-%d'), '{} vs. {}'.format(team, opponent),
+        rng.choice('WL'), rng.randint(10, 40), fgm, fga, round(fgm / fga, 3), 1, 4, 0.25, ftm, ftm + 1, 0.8, 1,
+        reb - 1, reb, ast, 1, 0, 2, 3, fgm * 2 + ftm, rng.randint(-20, 20), 1]
+
+
+def league_game_log(player_or_team='T', games_per_team=82, players_per_team=15, seed=0):
+    """A leaguegamelog response for a full season -- ~2460 rows for teams, ~26000 for players"""
+    rng = random.Random(seed)
+    rows = []
+    for game_number in range(games_per_team):
+        for team_index, team in enumerate(TEAMS):
+            opponent = TEAMS[(team_index + 1 + game_number) % 30]
+            if player_or_team == 'T':
+                rows.append(game_log_row(rng, 0, game_number, team, opponent))
+            else:
+                for player in range(rng.randint(players_per_team - 5, players_per_team)):
+                    rows.append(game_log_row(rng, 1000 + team_index * 20 + player, game_number, team, opponent))
+    return {'resource': 'leaguegamelog', 'parameters': {'PlayerOrTeam': player_or_team},
+            'resultSets': [{'name': 'LeagueGameLog', 'headers': GAME_LOG_HEADERS, 'rowSet': rows}]}
+
+
+def player_game_log(player_id, games=82, seed=0):
+    """A playergamelog response for one player's season"""
+    rng = random.Random(seed + int(player_id))
+    rows = [game_log_row(rng, player_id, game_number, 'GSW', 'LAL') for game_number in range(games)]
+    return {'resource': 'playergamelog', 'parameters': {'PlayerID': player_id},
+            'resultSets': [{'name': 'PlayerGameLog', 'headers': GAME_LOG_HEADERS, 'rowSet': rows}]}
@@ -0,0 +1,56 @@
+import asyncio
+import concurrent.futures
+
+
+async def fetch_all_async(stats, concurrency=20):
+    """Load a batch of unfetched Stat objects with at most `concurrency` requests in flight
+
+    :param stats: Stat objects, usually built with lazy=True
+    :param concurrency: Maximum number of requests running at once -- also the number of worker threads used
+    :return: The same objects, loaded, in input order
+    """
+    stats = list(stats)
+    semaphore = asyncio.Semaphore(concurrency)
+    with concurrent.futures.ThreadPoolExecutor(max(1, min(concurrency, len(stats)))) as executor:
+        async def fetch_one(stat):
+            async with semaphore:
+                return await stat.fetch_async(executor)
+
+        return await asyncio.gather(*[fetch_one(stat) for stat in stats])
+
+
+def fetch_all(stats, concurrency=20):
+    """Blocking wrapper around fetch_all_async -- can't be called from inside a running event loop
+
+    :param stats: Stat objects, usually built with lazy=True
+    :param concurrency: Maximum number of requests running at once
+    :return: The same objects, loaded, in input order
+    """
+    return asyncio.run(fetch_all_async(stats, concurrency))
+
+
+def build(stat_class, items, **kwargs):
+    """Build one unfetched Stat per item, e.g. build(Game, game_ids, Season='2015-16')
+
+    :param stat_class: A Stat subclass taking one positional argument (a game ID, player or team)
+    :param items: The positional argument for each object
+    :param kwargs: User-defined arguments shared by every object
+    :return: A list of Stat objects that haven't sent their request yet
+    """
+    return [stat_class(item, lazy=True, **kwargs) for item in items]
+
+
+async def gather_async(stat_class, items, concurrency=20, **kwargs):
+    return await fetch_all_async(build(stat_class, items, **kwargs), concurrency)
+
+
+def gather(stat_class, items, concurrency=20, **kwargs):
+    """Fetch a Stat subclass for every item, e.g. gather(PlayerGameLogs, players) -- results come back in input order
+
+    :param stat_class: A Stat subclass taking one positional argument (a game ID, player or team)
+    :param items: The positional argument for each request
+    :param concurrency: Maximum number of requests running at once
+    :param kwargs: User-defined arguments shared by every request
+    :return: A list of loaded Stat objects
+    """
+    return fetch_all(build(stat_class, items, **kwargs), concurrency)
@@ -1,41 +1,340 @@
-import requests
-import simplejson.scanner
-from pathlib import Path, WindowsPath
-import os
+from pathlib import Path
+import threading
+import re
+import time
+from bisect import bisect_left, bisect_right
+from types import MappingProxyType
+from lib.ResponseCache import ResponseCache, get_cache
+from lib.RequestScheduler import FetchResult, FetchError, get_scheduler, get_flights
+from lib.Instrumentation import get_instrumentation
+from lib.JsonStream import iter_result_sets, iter_decoded_result_sets
+from lib.ResultSet import ResultSet
+
+
+class IdIndex:
+    """In-memory name <-> ID lookup for one of the files in lists/
+
+    The file is read once per process and re-read only when its modification time changes, so repeated lookups don't
+    touch the disk. Names are stored under both "Last, First" and "First Last" forms.
+    """
+
+    lists_path = Path(__file__).resolve().parents[1] / 'lists'
+    _indexes = {}
+    _indexes_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.names = []
+        self.ids = {}
+        self.names_by_id = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_file(cls, file_name):
+        """Get the shared index for a file in lists/
+
+        :param file_name: Name of the list file, e.g. playerlist.txt
+        :return: The process-wide IdIndex for that file
+        """
+        with cls._indexes_lock:
+            if file_name not in cls._indexes:
+                cls._indexes[file_name] = cls(cls.lists_path / file_name)
+            return cls._indexes[file_name]
+
+    @classmethod
+    def players(cls):
+        return cls.for_file('playerlist.txt')
+
+    @classmethod
+    def teams(cls):
+        return cls.for_file('teamlist.txt')
+
+    @staticmethod
+    def normalize(name):
+        return ' '.join(str(name).lower().split())
+
+    @classmethod
+    def name_forms(cls, name):
+        """All normalized forms a name can be looked up by -- "Last, First" also gets stored as "First Last"
+
+        :param name: Name as written in the list file or given by the user
+        :return: A list of normalized keys
+        """
+        name = cls.normalize(name)
+        if ', ' in name:
+            last, first = name.split(', ', 1)
+            return [name, '{} {}'.format(first, last)]
+        return [name]
+
+    def refresh(self):
+        """Reload the file if it has changed on disk since it was last read
+
+        :return: None
+        """
+        try:
+            mtime = self.path.stat().st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            names, ids, names_by_id = [], {}, {}
+            if mtime is not None:
+                with self.path.open('r') as list_file:
+                    for line in list_file:
+                        if ': ' not in line:
+                            continue
+                        name, list_id = line.rstrip('\n').rsplit(': ', 1)
+                        names.append(name)
+                        names_by_id.setdefault(list_id, name)
+                        for key in self.name_forms(name):
+                            ids.setdefault(key, list_id)
+            self.names, self.ids, self.names_by_id, self._mtime = names, ids, names_by_id, mtime
+
+    def get_id(self, name):
+        """Look up the ID for a name, falling back to a partial match over the loaded names
+
+        :param name: Name in either "First Last" or "Last, First" format, or part of one
+        :return: The ID as a string, or None if nothing matches
+        """
+        self.refresh()
+        key = self.normalize(name)
+        if key in self.ids:
+            return self.ids[key]
+        candidates = [key]
+        if ',' not in key and ' ' in key:
+            candidates.append('{}, {}'.format(key.split(' ')[1], key.split(' ')[0]))
+        for list_name in self.names:
+            lowered = list_name.lower()
+            if any(candidate in lowered for candidate in candidates):
+                return self.ids[self.normalize(list_name)]
+        return None
+
+    def get_name(self, list_id):
+        """Reverse lookup from ID to the name as written in the list file
+
+        :param list_id: Player or team ID
+        :return: The name, or None if the ID isn't in the file
+        """
+        self.refresh()
+        return self.names_by_id.get(str(list_id))
+
+
+_NOT_LOADED = object()
+
+
+class Endpoint:
+    """One stats.nba.com endpoint -- its URL, default parameters and what it's about (a player, a team or the league)
+
+    The defaults are read-only and shared by every object made for the endpoint; each request gets one copy of them.
+    """
+
+    url_format = 'http://stats.nba.com/stats/{}?'
+
+    def __init__(self, name, scope, params):
+        """Describe an endpoint
+
+        :param name: The last part of the URL, e.g. playerdashptshots
+        :param scope: 'player' or 'team' if the class takes a name to look up the ID for, 'game' for Game, else 'league'
+        :param params: The default request parameters
+        """
+        self.name = name
+        self.url = self.url_format.format(name)
+        self.scope = scope
+        self.params = MappingProxyType(dict(params))
+        self.keys = {key.lower(): key for key in self.params}
+        if scope == 'player':
+            self.keys.setdefault('playerid', 'PlayerID')
+        elif scope == 'team':
+            self.keys.setdefault('teamid', 'TeamID')
+
+    def __repr__(self):
+        return 'Endpoint({!r}, {!r})'.format(self.name, self.scope)
+
 
 class Stat:
     """Super class to handle general stat gathering from stats.nba.com
 
-
+    Set Stat.lazy = True (or pass lazy=True to any subclass) to defer every request until data or list is first read.
+    Subclasses set endpoint to their entry in endpoints.
     """
 
+    lazy = False
+    endpoint = None
+
     def __init__(self, url, base_params, args, player=None, team=None):
         """Get data and sort it into a list of stat values
 
         :param url: The JSON library to retrieve data from -- provided by the subclasses
-        :param base_params: The required parameters for the JSON request -- provided by the subclasses
-        :param args: User-defined arguments to push in the request
+        :param base_params: The required parameters for the JSON request -- provided by the subclasses, and not changed
+        :param args: User-defined arguments to push in the request -- ValueError if one isn't in base_params
         :param player: User-defined argument to define a specific player to get statistics for -- only used some classes
         :param team: User-defined argument to define a specific team to get statistics for -- only used in some classes
         :return: None
+
+        Passing lazy=True with the user-defined arguments only records the request -- it is sent the first time data or
+        list is read (once, even across threads), or when the object is handed to lib.BatchFetch.
         """
+        lazy = args.pop('lazy', self.lazy)
+        params = dict(base_params)
         if player:
-            base_params['PlayerID'] = self.get_id_from_player(player)
+            params['PlayerID'] = self.get_id_from_player(player)
         if team:
-            base_params['TeamID'] = self.get_id_from_team(team)
-        self.data = self.get_data(url, self.create_params(base_params, args))
-        self.list = self.zip_data_as_list()
+            params['TeamID'] = self.get_id_from_team(team)
+        self.url = url
+        self.params = self.create_params(params, args, self.endpoint.keys if self.endpoint is not None and
+                                         base_params is self.endpoint.params else None)
+        self._data, self._list = _NOT_LOADED, _NOT_LOADED
+        self._load_lock = threading.Lock()
+        self.fetch_result = None
+        if not lazy:
+            self.fetch()
+
+    @property
+    def data(self):
+        if self._data is _NOT_LOADED:
+            self.ensure_loaded()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def list(self):
+        if self._list is _NOT_LOADED:
+            self.ensure_loaded()
+        return self._list
+
+    @list.setter
+    def list(self, value):
+        self._list = value
+
+    @property
+    def loaded(self):
+        return self._list is not _NOT_LOADED
+
+    def ensure_loaded(self):
+        """Fetch the data if it hasn't been fetched yet -- concurrent callers share the one request
+
+        :return: The Stat object
+        """
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    self.fetch()
+        return self
+
+    def fetch(self):
+        """Send the request and load the response
+
+        :return: The Stat object, now with data and list filled in -- fetch_result says whether the request worked
+        """
+        self.fetch_result = self.get_result(self.url, self.params)
+        return self.load(self.fetch_result.data)
+
+    def stream(self, chunk_size=65536):
+        """Read the response a chunk at a time and yield rows as they're decoded, instead of loading it -- for
+        payloads like a full season of player game logs or shot logs that are too big to hold three copies of
+
+        Responses already in the response cache are read from there; streamed responses aren't added to it, and data
+        and list stay unloaded.
+
+        :param chunk_size: Bytes to read from the connection at a time
+        :return: A generator of (name, headers, rows) per result set -- rows is an iterator that has to be used up
+        before moving on to the next result set
+        """
+        cached = get_cache().get(self.url, self.params)
+        if cached is not None:
+            get_instrumentation().record_cache_hit(self.url, self.params)
+            self.fetch_result = FetchResult(self.url, self.params, cached, cached=True)
+            yield from iter_decoded_result_sets(cached)
+            return
+        self.fetch_result = get_scheduler().fetch(self.url, self.params, stream=True)
+        get_instrumentation().record_fetch(self.fetch_result)
+        if not self.fetch_result.ok:
+            print('Request failed: {}'.format(self.fetch_result))
+            return
+        response, started, rows = self.fetch_result.response, time.perf_counter(), []
+
+        def chunks():
+            for chunk in response.iter_content(chunk_size):
+                self.fetch_result.bytes += len(chunk)
+                yield chunk
+
+        try:
+            for name, headers, result_rows in iter_result_sets(chunks()):
+                rows.append(result_rows)
+                yield name, headers, result_rows
+        finally:
+            response.close()
+            get_instrumentation().record_parse(self.url, time.perf_counter() - started,
+                                               sum(result_rows.read for result_rows in rows), self.fetch_result.bytes)
+
+    @property
+    def failed(self):
+        return self.fetch_result is not None and not self.fetch_result.ok
+
+    def raise_for_failure(self):
+        """Raise FetchError if the request gave up -- for jobs that shouldn't write out an empty result
+
+        :return: The Stat object
+        """
+        self.ensure_loaded()
+        if self.failed:
+            raise FetchError(self.fetch_result)
+        return self
+
+    async def fetch_async(self, executor=None):
+        """Async version of ensure_loaded -- the blocking request runs in the given executor so the event loop stays free
+
+        :param executor: A concurrent.futures executor, or None for the event loop's default one
+        :return: The Stat object, now with data and list filled in
+        """
+        import asyncio
+        if not self.loaded:
+            await asyncio.get_event_loop().run_in_executor(executor, self.ensure_loaded)
+        return self
+
+    def load(self, data):
+        """Fill in the object from an already-fetched response -- subclasses that post-process results hook in here
+
+        :param data: The decoded JSON response
+        :return: The Stat object
+        """
+        self._data = data
+        started = time.perf_counter()
+        self._list = self.zip_data_as_list()
+        get_instrumentation().record_parse(self.url, time.perf_counter() - started, self.count_rows(data))
+        return self
+
+    @staticmethod
+    def count_rows(data):
+        """Rows across every result set in a response
+
+        :param data: The decoded JSON response
+        :return: The row count
+        """
+        if not isinstance(data, dict):
+            return 0
+        result_sets = data.get('resultSets', [data.get('resultSet')])
+        if isinstance(result_sets, dict):
+            result_sets = [result_sets]
+        return sum(len(item.get('rowSet') or []) for item in result_sets if isinstance(item, dict))
 
     def zip_data_as_list(self):
-        """Takes the data that has already been received and converts it into [dict] format
+        """Takes the data that has already been received and converts it into ResultSet format
 
-        :return: A list of statistics sorted into a list
+        :return: A ResultSet of statistics, or a list of them when the response has several -- rows act like dicts
         """
         if self.data:
             try:
                 values = self.data['resultSet']['rowSet']
                 headers = self.data['resultSet']['headers']
-                return [dict(zip(headers, value)) for value in values]
+                return ResultSet(headers, values, self.data['resultSet'].get('name'))
             except KeyError:
                 try:
                     val_list = []
@@ -43,32 +342,97 @@ class Stat:
                         try:
                             values = item['rowSet']
                             headers = item['headers']
-                            val_list.append([dict(zip(headers, value)) for value in values])
+                            val_list.append(ResultSet(headers, values, item.get('name')))
                         except TypeError:
                             values = (self.data['resultSets']['rowSet'])
                             headers = (self.data['resultSets']['headers'][1])
                             print(headers)
-                            return [dict(zip(headers['columnNames'], value)) for value in values]
+                            return ResultSet(headers['columnNames'], values)
                     return val_list
                 except KeyError:
                     return None
 
+    def result_set(self, index=0):
+        """Get one ResultSet whether the response had a single result set or several
+
+        :param index: Which result set to get, for responses that have several
+        :return: The ResultSet, or None if there's no data
+        """
+        results = self.list
+        if isinstance(results, list):
+            return results[index] if len(results) > index else None
+        return results
+
+    def to_numpy(self, headers=None, result_set=0):
+        """Export a result set's numeric columns as typed NumPy arrays
+
+        :param headers: The columns to export, or None for every numeric column
+        :param result_set: Which result set to export, for responses that have several
+        :return: A dict of header -> numpy.ndarray, or None if there's no data
+        """
+        results = self.result_set(result_set)
+        return results.to_numpy(headers) if results is not None else None
+
+    def to_records(self, headers=None, result_set=0):
+        """Export a result set as a NumPy record array
+
+        :param headers: The columns to include, or None for all of them
+        :param result_set: Which result set to export, for responses that have several
+        :return: A numpy.recarray, or None if there's no data
+        """
+        results = self.result_set(result_set)
+        return results.to_records(headers) if results is not None else None
+
     @staticmethod
     def get_data(url, params):
         """Get the data from the JSON library provided
 
         :param url: The JSON library to retrieve data from -- provided by the subclasses
         :param params: The required parameters for the JSON request -- provided by the subclasses
-        :return: The actual unsorted data from the JSON library
+        :return: The actual unsorted data from the JSON library, or None if the request failed
         """
-        try:
-            return requests.get(url, params, timeout=10).json()
-        except requests.RequestException:
-            return None
-        except simplejson.scanner.JSONDecodeError:
-            print(requests.get(url, params).url)
-            print('Something went wrong with the parameters or URL')
-            return None
+        return Stat.get_result(url, params).data
+
+    @staticmethod
+    def get_result(url, params):
+        """Get the data through the response cache and the shared RequestScheduler
+
+        Identical requests made at the same time from different threads (or fetch_async calls) share one request and
+        one decoded response -- see get_flights().stats() for how many were saved.
+
+        :param url: The JSON library to retrieve data from
+        :param params: The required parameters for the JSON request
+        :return: A FetchResult -- its data on success, otherwise the error, HTTP status and number of attempts
+        """
+        cache = get_cache()
+        data = cache.get(url, params)
+        if data is not None:
+            get_instrumentation().record_cache_hit(url, params)
+            return FetchResult(url, params, data, cached=True)
+        key = ResponseCache.key(url, params)
+
+        def lead():
+            # A flight for the same request may have finished and filled the cache since the check above
+            cached = cache.load(key)
+            if cached is not None:
+                get_instrumentation().record_cache_hit(url, params)
+                return FetchResult(url, params, cached, cached=True)
+            return Stat.send_request(url, params)
+
+        result, shared = get_flights().do(key, lead)
+        if shared:
+            get_instrumentation().record_coalesced(url, params)
+        return result
+
+    @staticmethod
+    def send_request(url, params):
+        result = get_scheduler().fetch(url, params)
+        get_instrumentation().record_fetch(result)
+        if result.ok:
+            get_cache().set(url, params, result.data)
+        else:
+            print('Request failed: {}'.format(result))
+        return result
 
     @staticmethod
     def remove(change_list, index):
@@ -106,22 +470,7 @@ class Stat:
         :param player: Name of the player, can be provided in either FirstName LastName format, or LastName, FirstName
         :return: The ID of the specified player
         """
-
-        lists_path = [str(path) for path in Path(os.getcwd()).parents if path.name == 'NBAStatsV2'][0]
-
-        if not player.__contains__(',') and not player.lower() == 'nene':
-            player = '{}, {}'.format(player.split(' ')[1], player.split(' ')[0])
-        try:
-            with open(lists_path + '/lists/playerlist.txt', 'r') as player_file:
-                try:
-                    return [line.split(': ')[1].replace('\n', '') for line in player_file
-                            if line.__contains__(player)][0]
-                except IndexError:
-
-                    return None
-        except FileNotFoundError:
-            print('oh no!')
-            return None
+        return IdIndex.players().get_id(player)
 
     @staticmethod
     def get_id_from_team(team):
@@ -130,251 +479,229 @@ class Stat:
         :param team: Name of the team
         :return: The ID of the team
         """
-        try:
-            with open('lists/teamlist.txt', 'r') as team_file:
-                try:
-                    return [line.split(': ')[1].replace('\n', '') for line in team_file if line.__contains__(team)][0]
-                except IndexError:
-                    return None
-        except FileNotFoundError:
-            return None
+        return IdIndex.teams().get_id(team)
 
     @staticmethod
-    def create_params(base_params, args):
+    def create_params(base_params, args, keys=None):
         """Method to take any user-specified parameters and insert them into the base_params, used before every request
 
-        :param base_params: The original parameters as provided by the subclass
+        Parameter names are matched without regard to case, so Season works for an endpoint that wants season.
+
+        :param base_params: The original parameters as provided by the subclass -- changed in place
         :param args: The user-specified parameters
+        :param keys: Lower-cased name -> name for base_params, if it's already been worked out (Endpoint.keys)
         :return: The parameters - with the user specified ones changed
         """
-        for key in args.keys():
-            if key in base_params:
-                base_params[key] = args[key]
+        if keys is None:
+            keys = {key.lower(): key for key in base_params}
+        unknown = []
+        for key, value in args.items():
+            name = keys.get(key.lower())
+            if name is None:
+                unknown.append(key)
+            else:
+                base_params[name] = value
+        if unknown:
+            raise ValueError('Unknown parameter(s) {} -- expected some of {}'.format(
+                ', '.join(sorted(unknown)), ', '.join(sorted(set(keys.values())))))
 
         return base_params
 
 
-class LeagueLeaders(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'LeagueID': '00', 'PerMode': 'PerGame', 'Scope': 'S', 'Season': '2015-16',
-                  'SeasonType': 'Regular Season', 'StatCategory': 'PTS'}
-
-        super().__init__('http://stats.nba.com/stats/leagueleaders?', params, kwargs)
-
-
-class AllPlayersList(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'IsOnlyCurrentSeason': '0', 'LeagueID': '00', 'Season': '2015-16'}
-        super().__init__('http://stats.nba.com/stats/commonallplayers?', params, kwargs)
-
-    def write_to_file(self):
-        if self.list:
-            try:
-                with open('../TechnicalEffects/playerlist.txt', 'w') as player_list:
-                    for player in list(self.list[0]):
-                        player_list.write('{}: {}\n'.format(player['DISPLAY_LAST_COMMA_FIRST'], player['PERSON_ID']))
-            except FileNotFoundError:
-                return None
-            except KeyError:
-                return None
-
-
-class GeneralPlayerStats(Stat):
-
-    def __init__(self, player, **kwargs):
-        params = {'DateFrom': '', 'DateTo': '', 'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00', 'Location': '',
-                  'MeasureType': 'Base', 'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0',
-                  'PaceAdjust': 'N', 'PerMode': 'PerGame', 'Period': '0', 'PlusMinus': 'N', 'Rank': 'N',
-                  'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '',
-                  'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/playerdashboardbygeneralsplits?', params, kwargs, player=player)
-
-
-class PlayerShotTracking(Stat):
-
-    def __init__(self, player, **kwargs):
-        params = {'DateFrom': '', 'DateTo': '', 'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00', 'Location': '',
-                  'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'TeamID': '0', 'Season': '2015-16', 'SeasonSegment': '',
-                  'SeasonType': 'Regular Season', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/playerdashptshots?', params, kwargs, player=player)
-
+_player_dashboard_params = {'DateFrom': '', 'DateTo': '', 'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00',
+                            'Location': '', 'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PaceAdjust': 'N',
+                            'PerMode': 'PerGame', 'Period': '0', 'TeamID': '0', 'Season': '2015-16',
+                            'SeasonSegment': '', 'SeasonType': 'Regular Season', 'VsConference': '', 'VsDivision': ''}
+
+_league_player_params = {'College': '', 'Conference': '', 'Country': '', 'DateFrom': '', 'DateTo': '', 'Division': '',
+                         'DraftPick': '', 'DraftYear': '', 'GameScope': '', 'GameSegment': '', 'Height': '',
+                         'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
+                         'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
+                         'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N',
+                         'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season',
+                         'ShotClockRange': '', 'StarterBench': '', 'TeamID': '0', 'VsConference': '', 'VsDivision': '',
+                         'Weight': ''}
+
+_league_player_clutch_params = dict(_league_player_params, AheadBehind='Ahead or Behind', ClutchTime='Last 5 Minutes',
+                                    PointDiff='5')
+
+_league_player_bio_params = dict(_league_player_clutch_params, DistanceRange='5ft Range')
+
+_team_dashboard_params = {'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameScope': '',
+                          'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base',
+                          'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N',
+                          'PerMode': 'PerGame', 'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '',
+                          'PlusMinus': 'N', 'Rank': 'N', 'Season': '2015-16', 'SeasonSegment': '',
+                          'SeasonType': 'Regular Season', 'ShotClockRange': '', 'StarterBench': '', 'TeamID': '0',
+                          'VsConference': '', 'VsDivision': ''}
+
+_draft_combine_params = {'LeagueID': '00', 'SeasonYear': '2015-16'}
+
+endpoints = {
+    'LeagueLeaders': Endpoint('leagueleaders', 'league', {'LeagueID': '00', 'PerMode': 'PerGame', 'Scope': 'S',
+                                                          'Season': '2015-16', 'SeasonType': 'Regular Season',
+                                                          'StatCategory': 'PTS'}),
+    'AllPlayersList': Endpoint('commonallplayers', 'league', {'IsOnlyCurrentSeason': '0', 'LeagueID': '00',
+                                                              'Season': '2015-16'}),
+    'GeneralPlayerStats': Endpoint('playerdashboardbygeneralsplits', 'player', {
+        'DateFrom': '', 'DateTo': '', 'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00', 'Location': '',
+        'MeasureType': 'Base', 'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N',
+        'PerMode': 'PerGame', 'Period': '0', 'PlusMinus': 'N', 'Rank': 'N', 'Season': '2015-16', 'SeasonSegment': '',
+        'SeasonType': 'Regular Season', 'ShotClockRange': '', 'VsConference': '', 'VsDivision': ''}),
+    'PlayerShotTracking': Endpoint('playerdashptshots', 'player', _player_dashboard_params),
+    # TODO: LeaguePlayerNormalStats.sort_list(stat) -- sort self.list[0] by a stat
+    'LeaguePlayerNormalStats': Endpoint('leaguedashplayerstats', 'league', _league_player_params),
+    'LeaguePlayerClutchStats': Endpoint('leaguedashplayerclutch', 'league', _league_player_clutch_params),
+    # TODO: LeaguePlayerShotStats (leaguedashplayershotlocations, _league_player_bio_params) -- the problem is that
+    # instead of storing the values in individual dicts, they stored them in just one dict, which breaks
+    # zip_data_as_list -- can be fixed by checking the length of the dict before I take the info.
+    'LeaguePlayerBios': Endpoint('leaguedashplayerbiostats', 'league', _league_player_bio_params),
+    'LeagueGameLogs': Endpoint('leaguegamelog', 'league', dict(_league_player_bio_params, Counter='1000',
+                                                               Direction='DESC', PlayerOrTeam='P', Sorter='PTS')),
+    'PlayerReboundTracking': Endpoint('playerdashptreb', 'player', _player_dashboard_params),
+    'PlayerPassTracking': Endpoint('playerdashptpass', 'player', _player_dashboard_params),
+    'PlayerDefenseTracking': Endpoint('playerdashptshotdefend', 'player', _player_dashboard_params),
+    'PlayerShotLogTracking': Endpoint('playerdashptshotlog', 'player', _player_dashboard_params),
+    'PlayerReboundLogTracking': Endpoint('playerdashptreboundlogs', 'player', _player_dashboard_params),
+    'PlayerGameLogs': Endpoint('playergamelog', 'player', {'LeagueID': '00', 'Season': '2015-16',
+                                                           'SeasonType': 'Regular Season'}),
+    'PlayerCareerStats': Endpoint('playercareerstats', 'player', {'LeagueID': '00', 'PerMode': 'PerGame',
+                                                                  'Season': '2015-16', 'SeasonType': 'Regular Season'}),
+    'AllTeamsList': Endpoint('leaguedashteamstats', 'league', _team_dashboard_params),
+    'LeagueTeamStats': Endpoint('leaguedashteamstats', 'league', _team_dashboard_params),
+    'TeamGeneralStats': Endpoint('teamdashboardbygeneralsplits', 'team', _team_dashboard_params),
+    'TeamLineupStats': Endpoint('teamdashlineups', 'team', {
+        'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameID': '', 'GameSegment': '',
+        'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
+        'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame', 'Period': '0',
+        'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N', 'Season': '2015-16',
+        'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '', 'StarterBench': '', 'TeamID': '0',
+        'VsConference': '', 'VsDivision': '', 'GroupQuantity': '5'}),
+    'TeamPlayerStats': Endpoint('teamplayerdashboard', 'team', _team_dashboard_params),
+    'TeamOnOffStats': Endpoint('teamplayeronoffdetails', 'team', dict(_team_dashboard_params, PerMode='Per48')),
+    'TeamGameLogs': Endpoint('teamgamelog', 'team', {'LeagueID': '00', 'Season': '2015-16',
+                                                     'SeasonType': 'Regular Season'}),
+    'TeamHistoryStats': Endpoint('teamyearbyyearstats', 'team', {'LeagueID': '00', 'PerMode': 'Totals',
+                                                                 'SeasonType': 'Regular Season'}),
+    'TeamShotTracking': Endpoint('teamdashptshots', 'team', _team_dashboard_params),
+    'TeamReboundTracking': Endpoint('teamdashptreb', 'team', _team_dashboard_params),
+    'TeamPassTracking': Endpoint('teamdashptpass', 'team', _team_dashboard_params),
+    'TeamRoster': Endpoint('commonteamroster', 'team', {'LeagueID': '00', 'Season': '2015-16'}),
+    'TeamGeneralInfo': Endpoint('teaminfocommon', 'team', {'LeagueID': '00', 'SeasonType': 'Regular Season',
+                                                           'season': '2015-16'}),
+    'PlayoffPicture': Endpoint('playoffpicture', 'league', {'LeagueID': '00', 'SeasonID': '22015'}),
+    'FranchiseHistory': Endpoint('franchisehistory', 'league', {'LeagueID': '00'}),
+    # Draft Combine Stats work from my end -- but the stats are very incomplete from an NBA end, many of the values are
+    # left unfilled -- so don't expect these to work very well for real usage.
+    'DraftCombineGeneralStats': Endpoint('draftcombinestats', 'league', _draft_combine_params),
+    'DraftCombineSpotUpStats': Endpoint('draftcombinespotshooting', 'league', _draft_combine_params),
+    'DraftCombineNonStationaryStats': Endpoint('draftcombinenonstationaryshooting', 'league', _draft_combine_params),
+    'DraftCombineStrengthAgilityStats': Endpoint('draftcombinedrillresults', 'league', _draft_combine_params),
+    'DraftCombineBodyStats': Endpoint('draftcombineplayeranthro', 'league', _draft_combine_params),
+    'DraftHistory': Endpoint('drafthistory', 'league', {'College': '', 'LeagueID': '00', 'OverallPick': '',
+                                                        'RoundNum': '', 'RoundPick': '', 'Season': '2015',
+                                                        'TeamID': '0', 'TopX': ''}),
+    'NBAScores': Endpoint('scoreboardV2', 'league', {'DayOffset': '', 'LeagueID': '00'}),
+    'GameList': Endpoint('leaguegamelog', 'league', {'Counter': '1000', 'DateFrom': '', 'DateTo': '',
+                                                     'Direction': 'DESC', 'LeagueID': '00', 'PlayerOrTeam': 'T',
+                                                     'Season': '2015-16', 'SeasonType': 'Regular Season',
+                                                     'Sorter': 'PTS'}),
+    'Game': Endpoint('playbyplayv2', 'game', {'EndPeriod': '10', 'EndRange': '55800', 'GameID': '', 'RangeType': '2',
+                                              'Season': '2015-16', 'SeasonType': 'Regular Season', 'StartPeriod': '1',
+                                              'StartRange': '0'}),
+}
+
+
+def _league_init(self, **kwargs):
+    """Set up the request and, unless lazy=True is passed, send it
+
+    :param kwargs: Request parameters to change from the endpoint's defaults
+    """
+    Stat.__init__(self, self.endpoint.url, self.endpoint.params, kwargs)
 
-class LeaguePlayerNormalStats(Stat):
 
-    def __init__(self, **kwargs):
-        params = {'College': '', 'Conference': '', 'Country': '', 'DateFrom': '', 'DateTo': '', 'Division': '',
-                  'DraftPick': '', 'DraftYear': '', 'GameScope': '', 'GameSegment': '', 'Height': '', 'LastNGames': '0',
-                  'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0', 'OpponentTeamID': '0',
-                  'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame', 'Period': '0',
-                  'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N', 'Season': '2015-16',
-                  'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '', 'StarterBench': '',
-                  'TeamID': '0', 'VsConference': '', 'VsDivision': '', 'Weight': ''}
-        super().__init__('http://stats.nba.com/stats/leaguedashplayerstats?', params, kwargs)
-        print(self.list)
+def _player_init(self, player, **kwargs):
+    """Set up the request for one player and, unless lazy=True is passed, send it
 
+    :param player: Name of the player
+    :param kwargs: Request parameters to change from the endpoint's defaults
     """
-    # TODO: FIX THIS LATER
-    def sort_list(self, stat):
-        try:
-            return sorted([item for item in self.list[0]], key=lambda x: item[stat])
-        except IndexError:
-            return None
-        except AttributeError:
-            return None
-    """
+    Stat.__init__(self, self.endpoint.url, self.endpoint.params, kwargs, player=player)
 
 
-class LeaguePlayerClutchStats(Stat):
+def _team_init(self, team, **kwargs):
+    """Set up the request for one team and, unless lazy=True is passed, send it
 
-    def __init__(self, **kwargs):
-        params = {'College': '', 'Conference': '', 'Country': '', 'DateFrom': '', 'DateTo': '', 'Division': '',
-                  'DraftPick': '', 'DraftYear': '', 'GameScope': '', 'GameSegment': '', 'Height': '', 'LastNGames': '0',
-                  'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0', 'OpponentTeamID': '0',
-                  'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame', 'Period': '0',
-                  'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N', 'Season': '2015-16',
-                  'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '', 'StarterBench': '',
-                  'TeamID': '0', 'VsConference': '', 'VsDivision': '', 'Weight': '', 'AheadBehind': 'Ahead or Behind',
-                  'ClutchTime': 'Last 5 Minutes', 'PointDiff': '5'}
-        super().__init__('http://stats.nba.com/stats/leaguedashplayerclutch?', params, kwargs)
+    :param team: Name of the team
+    :param kwargs: Request parameters to change from the endpoint's defaults
+    """
+    Stat.__init__(self, self.endpoint.url, self.endpoint.params, kwargs, team=team)
 
-        print(self.list[0][0])
 
-"""
+_scope_inits = {'league': _league_init, 'player': _player_init, 'team': _team_init}
+_endpoint_classes_lock = threading.Lock()
 
-class LeaguePlayerShotStats(Stat):
 
-    def __init__(self, **kwargs):
-        params = {'College': '', 'Conference': '', 'Country': '', 'DateFrom': '', 'DateTo': '', 'Division': '',
-                  'DraftPick': '', 'DraftYear': '', 'GameScope': '', 'GameSegment': '', 'Height': '', 'LastNGames': '0',
-                  'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0', 'OpponentTeamID': '0',
-                  'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame', 'Period': '0',
-                  'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N', 'Season': '2015-16',
-                  'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '', 'StarterBench': '',
-                  'TeamID': '0', 'VsConference': '', 'VsDivision': '', 'Weight': '', 'AheadBehind': 'Ahead or Behind',
-                  'ClutchTime': 'Last 5 Minutes', 'PointDiff': '5', 'DistanceRange': '5ft Range'}
-        super().__init__('http://stats.nba.com/stats/leaguedashplayershotlocations?', params, kwargs)
+def endpoint_class(name):
+    """Get the Stat subclass for an entry in endpoints, building it the first time it's asked for
 
-        print(self.list[0])
+    Endpoints with their own methods (GameList, Game, AllTeamsList, ...) are written out as classes further down; the
+    rest only differ in their URL and default parameters, so they're made from the table.
 
-# TODO: fix the problem with the above class -- the problem is that instead of storing the values in individual dicts,
-# they stored them in just one dict, which breaks the last part -- can be fixed by checking the length of the dict
-# before I take the info.
+    :param name: The class name, e.g. PlayerShotTracking
+    :return: The class
+    """
+    with _endpoint_classes_lock:
+        cls = globals().get(name)
+        if cls is None:
+            endpoint = endpoints[name]
+            cls = type(name, (Stat,), {'__init__': _scope_inits[endpoint.scope], '__module__': __name__,
+                                       '__qualname__': name, 'endpoint': endpoint,
+                                       '__doc__': 'stats.nba.com {} endpoint'.format(endpoint.name)})
+            globals()[name] = cls
+        return cls
 
-"""
 
+def __getattr__(name):
+    if name in endpoints:
+        return endpoint_class(name)
+    raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
 
-class LeaguePlayerBios(Stat):
 
-    def __init__(self, **kwargs):
-        params = {'College': '', 'Conference': '', 'Country': '', 'DateFrom': '', 'DateTo': '', 'Division': '',
-                  'DraftPick': '', 'DraftYear': '', 'GameScope': '', 'GameSegment': '', 'Height': '', 'LastNGames': '0',
-                  'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0', 'OpponentTeamID': '0',
-                  'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame', 'Period': '0',
-                  'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N', 'Season': '2015-16',
-                  'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '', 'StarterBench': '',
-                  'TeamID': '0', 'VsConference': '', 'VsDivision': '', 'Weight': '', 'AheadBehind': 'Ahead or Behind',
-                  'ClutchTime': 'Last 5 Minutes', 'PointDiff': '5', 'DistanceRange': '5ft Range'}
-        super().__init__('http://stats.nba.com/stats/leaguedashplayerbiostats?', params, kwargs)
+def __dir__():
+    return sorted(set(globals()) | set(endpoints))
 
-        print(self.list[0][0])
 
+class AllPlayersList(Stat):
 
-class LeagueGameLogs(Stat):
+    endpoint = endpoints['AllPlayersList']
 
     def __init__(self, **kwargs):
-        params = {'College': '', 'Conference': '', 'Country': '', 'DateFrom': '', 'DateTo': '', 'Division': '',
-                  'DraftPick': '', 'DraftYear': '', 'GameScope': '', 'GameSegment': '', 'Height': '', 'LastNGames': '0',
-                  'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0', 'OpponentTeamID': '0',
-                  'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame', 'Period': '0',
-                  'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N', 'Season': '2015-16',
-                  'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '', 'StarterBench': '',
-                  'TeamID': '0', 'VsConference': '', 'VsDivision': '', 'Weight': '', 'AheadBehind': 'Ahead or Behind',
-                  'ClutchTime': 'Last 5 Minutes', 'PointDiff': '5', 'DistanceRange': '5ft Range', 'Counter': '1000',
-                  'Direction': 'DESC',  'PlayerOrTeam': 'P', 'Sorter': 'PTS'}
-        super().__init__('http://stats.nba.com/stats/leaguegamelog?', params, kwargs)
-
-        print(self.list[0][0])
-
-
-class PlayerReboundTracking(Stat):
-
-    def __init__(self, player, **kwargs):
-        params = {'DateFrom': '', 'DateTo': '', 'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00', 'Location': '',
-                  'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'TeamID': '0', 'Season': '2015-16', 'SeasonSegment': '',
-                  'SeasonType': 'Regular Season', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/playerdashptreb?', params, kwargs, player=player)
-
-
-class PlayerPassTracking(Stat):
-
-    def __init__(self, player, **kwargs):
-        params = {'DateFrom': '', 'DateTo': '', 'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00', 'Location': '',
-                  'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'TeamID': '0', 'Season': '2015-16', 'SeasonSegment': '',
-                  'SeasonType': 'Regular Season', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/playerdashptpass?', params, kwargs, player=player)
-
-
-class PlayerDefenseTracking(Stat):
-
-    def __init__(self, player, **kwargs):
-        params = {'DateFrom': '', 'DateTo': '', 'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00', 'Location': '',
-                  'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'TeamID': '0', 'Season': '2015-16', 'SeasonSegment': '',
-                  'SeasonType': 'Regular Season', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/playerdashptshotdefend?', params, kwargs, player=player)
-
+        super().__init__(self.endpoint.url, self.endpoint.params, kwargs)
 
-class PlayerShotLogTracking(Stat):
-
-    def __init__(self, player, **kwargs):
-        params = {'DateFrom': '', 'DateTo': '', 'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00', 'Location': '',
-                  'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'TeamID': '0', 'Season': '2015-16', 'SeasonSegment': '',
-                  'SeasonType': 'Regular Season', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/playerdashptshotlog?', params, kwargs, player=player)
-
-
-class PlayerReboundLogTracking(Stat):
-
-    def __init__(self, player, **kwargs):
-        params = {'DateFrom': '', 'DateTo': '', 'GameSegment': '', 'LastNGames': '0', 'LeagueID': '00', 'Location': '',
-                  'Month': '0', 'OpponentTeamID': '0', 'Outcome': '', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'TeamID': '0', 'Season': '2015-16', 'SeasonSegment': '',
-                  'SeasonType': 'Regular Season', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/playerdashptreboundlogs?', params, kwargs, player=player)
-
-
-class PlayerGameLogs(Stat):
-
-    def __init__(self, player, **kwargs):
-        params = {'LeagueID': '00', 'Season': '2015-16', 'SeasonType': 'Regular Season'}
-        super().__init__('http://stats.nba.com/stats/playergamelog?', params, kwargs, player=player)
-
-class PlayerCareerStats(Stat):
-
-    def __init__(self, player, **kwargs):
-        params = {'LeagueID': '00', 'PerMode': 'PerGame', 'Season': '2015-16', 'SeasonType': 'Regular Season'}
-        super().__init__('http://stats.nba.com/stats/playercareerstats?', params, kwargs, player=player)
+    def write_to_file(self):
+        if self.list:
+            try:
+                with open('../TechnicalEffects/playerlist.txt', 'w') as player_list:
+                    for player in list(self.list[0]):
+                        player_list.write('{}: {}\n'.format(player['DISPLAY_LAST_COMMA_FIRST'], player['PERSON_ID']))
+            except FileNotFoundError:
+                return None
+            except KeyError:
+                return None
 
 
 class AllTeamsList(Stat):
 
-    def __init__(self, **kwargs):
-        params = {'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameScope': '', 'GameSegment': '',
-                  'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
-                  'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N',
-                  'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '',
-                  'StarterBench': '', 'TeamID': '0', 'VsConference': '', 'VsDivision': ''}
+    endpoint = endpoints['AllTeamsList']
 
-        super().__init__('http://stats.nba.com/stats/leaguedashteamstats?', params, kwargs)
+    def __init__(self, **kwargs):
+        super().__init__(self.endpoint.url, self.endpoint.params, kwargs)
 
+    def load(self, data):
+        super().load(data)
         self.write_to_file()
+        return self
 
     def write_to_file(self):
         if self.list:
@@ -388,219 +715,29 @@ class AllTeamsList(Stat):
                 return None
 
 
-class TeamGeneralStats(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameScope': '', 'GameSegment': '',
-                  'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
-                  'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N',
-                  'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '',
-                  'StarterBench': '', 'TeamID': '0', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/teamdashboardbygeneralsplits?', params, kwargs, team=team)
-
-
-class TeamLineupStats(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameID': '', 'GameSegment': '',
-                  'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
-                  'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N',
-                  'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '',
-                  'StarterBench': '', 'TeamID': '0', 'VsConference': '', 'VsDivision': '', 'GroupQuantity': '5'}
-        super().__init__('http://stats.nba.com/stats/teamdashlineups?', params, kwargs, team=team)
-
-
-class TeamPlayerStats(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameScope': '', 'GameSegment': '',
-                  'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
-                  'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N',
-                  'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '',
-                  'StarterBench': '', 'TeamID': '0', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/teamplayerdashboard?', params, kwargs, team=team)
-
-        print(self.list[1][0])
-
-
-class TeamOnOffStats(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameScope': '', 'GameSegment': '',
-                  'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
-                  'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'Per48',
-                  'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N',
-                  'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '',
-                  'StarterBench': '', 'TeamID': '0', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/teamplayeronoffdetails?', params, kwargs, team=team)
-
-
-class TeamGameLogs(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'LeagueID': '00', 'Season': '2015-16', 'SeasonType': 'Regular Season'}
-        super().__init__('http://stats.nba.com/stats/teamgamelog?', params, kwargs, team=team)
-
-        print(self.list[0][0])
-
-
-class TeamHistoryStats(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'LeagueID': '00', 'PerMode': 'Totals', 'SeasonType': 'Regular Season'}
-        super().__init__('http://stats.nba.com/stats/teamyearbyyearstats?', params, kwargs, team=team)
-
-        print(self.list[0][0])
-
-
-class TeamShotTracking(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameScope': '', 'GameSegment': '',
-                  'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
-                  'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N',
-                  'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '',
-                  'StarterBench': '', 'TeamID': '0', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/teamdashptshots?', params, kwargs, team=team)
-
-
-class TeamReboundTracking(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameScope': '', 'GameSegment': '',
-                  'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
-                  'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N',
-                  'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '',
-                  'StarterBench': '', 'TeamID': '0', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/teamdashptreb?', params, kwargs, team=team)
-
-        print(self.list[0])
-
-
-class TeamPassTracking(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'Conference': '', 'DateFrom': '', 'DateTo': '', 'Division': '', 'GameScope': '', 'GameSegment': '',
-                  'LastNGames': '0', 'LeagueID': '00', 'Location': '', 'MeasureType': 'Base', 'Month': '0',
-                  'OpponentTeamID': '0', 'Outcome': '', 'PORound': '0', 'PaceAdjust': 'N', 'PerMode': 'PerGame',
-                  'Period': '0', 'PlayerExperience': '', 'PlayerPosition': '', 'PlusMinus': 'N', 'Rank': 'N',
-                  'Season': '2015-16', 'SeasonSegment': '', 'SeasonType': 'Regular Season', 'ShotClockRange': '',
-                  'StarterBench': '', 'TeamID': '0', 'VsConference': '', 'VsDivision': ''}
-        super().__init__('http://stats.nba.com/stats/teamdashptpass?', params, kwargs, team=team)
-
-
-class TeamRoster(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'LeagueID': '00', 'Season': '2015-16'}
-        super().__init__('http://stats.nba.com/stats/commonteamroster?', params, kwargs, team=team)
-
-
-class TeamGeneralInfo(Stat):
-
-    def __init__(self, team, **kwargs):
-        params = {'LeagueID': '00', 'SeasonType': 'Regular Season', 'season': '2015-16'}
-        super().__init__('http://stats.nba.com/stats/teaminfocommon?', params, kwargs, team=team)
-
-
-class PlayoffPicture(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'LeagueID': '00', 'SeasonID': '22015'}
-        super().__init__('http://stats.nba.com/stats/playoffpicture?', params, kwargs)
-
-
-class FranchiseHistory(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'LeagueID': '00'}
-        super().__init__('http://stats.nba.com/stats/franchisehistory?', params, kwargs)
-
-        print(self.list[1][0])
-
-
-class DraftCombineGeneralStats(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'LeagueID': '00', 'SeasonYear': '2015-16'}
-        super().__init__('http://stats.nba.com/stats/draftcombinestats?', params, kwargs)
-
-        print(self.list[0][0])
-
-
-class DraftCombineSpotUpStats(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'LeagueID': '00', 'SeasonYear': '2015-16'}
-        super().__init__('http://stats.nba.com/stats/draftcombinespotshooting?', params, kwargs)
-
-        print(self.list[0][0])
-
-
-class DraftCombineNonStationaryStats(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'LeagueID': '00', 'SeasonYear': '2015-16'}
-        super().__init__('http://stats.nba.com/stats/draftcombinenonstationaryshooting?', params, kwargs)
-
-        print(self.list[0][0])
-
-
-class DraftCombineStrengthAgilityStats(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'LeagueID': '00', 'SeasonYear': '2015-16'}
-        super().__init__('http://stats.nba.com/stats/draftcombinedrillresults?', params, kwargs)
-
-        print(self.list[0][0])
-
-
-class DraftCombineBodyStats(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'LeagueID': '00', 'SeasonYear': '2015-16'}
-        super().__init__('http://stats.nba.com/stats/draftcombineplayeranthro?', params, kwargs)
-
-        print(self.list[0][0])
-
-
-class DraftHistory(Stat):
-
-    def __init__(self, **kwargs):
-        params = {'College': '', 'LeagueID': '00', 'OverallPick': '', 'RoundNum': '', 'RoundPick': '', 'Season': '2015',
-                  'TeamID': '0', 'TopX': ''}
-        super().__init__('http://stats.nba.com/stats/drafthistory?', params, kwargs)
-
-        print(self.list[0][0])
-
-
-# Draft Combine Stats work from my end -- but the stats are very incomplete from an NBA end, many of the values are left
-# unfilled -- so don't expect these to work very well for real usage.
-
-
 class NBAScores(Stat):
 
+    endpoint = endpoints['NBAScores']
+
     def __init__(self, **kwargs):
-        params = {'DayOffset': '', 'LeagueID': '00'}
-        super().__init__('http://stats.nba.com/stats/scoreboardV2?', params, kwargs)
+        super().__init__(self.endpoint.url, self.endpoint.params, kwargs)
 
     @staticmethod
     def get_date():
         return None
 
+
 # ~~ News Stuff ~~ #
 
 
 class News:
 
     def __init__(self, url, base_params=None):
-        self.data = self.get_data(url, base_params)
+        self.fetch_result = Stat.get_result(url, base_params)
+        self.data = self.fetch_result.data
+        started = time.perf_counter()
         self.list = self.create_sorted_news()
+        get_instrumentation().record_parse(url, time.perf_counter() - started, len(self.list or []))
 
     def create_sorted_news(self):
         if self.data:
@@ -617,14 +754,7 @@ class News:
 
     @staticmethod
     def get_data(url, params):
-        try:
-            return requests.get(url, params).json()
-        except requests.RequestException:
-            return None
-        except simplejson.scanner.JSONDecodeError:
-            print(requests.get(url, params).url)
-            print('Something went wrong with the parameters or URL')
-            return None
+        return Stat.get_result(url, params).data
 
 
 class BeyondTheNumbers(News):
@@ -716,46 +846,327 @@ class Update(Post):
 
 # ~~ Play By Play Stuff ~~ #
 
+def season_range(first, last):
+    """List every season between two seasons, e.g. season_range('1996-97', '1998-99')
+
+    :param first: The first season, in YYYY-YY format
+    :param last: The last season, in YYYY-YY format
+    :return: A list of seasons in YYYY-YY format
+    """
+    return ['{}-{:02d}'.format(year, (year + 1) % 100) for year in range(int(first[:4]), int(last[:4]) + 1)]
+
+
+class SeasonGameIndex:
+    """Every game in a season's team game log, with lookups by team, date, home/away and matchup
+
+    Built in one pass over the log, which has one row per team per game.
+    """
+
+    def __init__(self, games):
+        """Index a team game log
+
+        :param games: The leaguegamelog ResultSet (PlayerOrTeam='T'), or None
+        """
+        self.game_ids = []
+        self.info = {}
+        self.by_team, self.by_date, self.by_matchup = {}, {}, {}
+        self.home_games, self.away_games = {}, {}
+        self.team_names = {}
+        if not games:
+            return
+        empty = [None] * len(games)
+        columns = [games.column(header) if games.has_column(header) else empty for header in
+                   ('GAME_ID', 'TEAM_ABBREVIATION', 'TEAM_NAME', 'GAME_DATE', 'MATCHUP')]
+        for game_id, team, team_name, game_date, matchup in zip(*columns):
+            if team_name:
+                self.team_names[team_name.lower()] = team
+            info = self.info.get(game_id)
+            if info is None:
+                info = self.info[game_id] = {'date': game_date, 'home': None, 'away': None}
+                self.game_ids.append(game_id)
+                self.by_date.setdefault(game_date, []).append(game_id)
+            self.by_team.setdefault(team, []).append(game_id)
+            if matchup and ' @ ' in matchup:
+                info['away'] = team
+                self.away_games.setdefault(team, []).append(game_id)
+            elif matchup and ' vs. ' in matchup:
+                info['home'] = team
+                self.home_games.setdefault(team, []).append(game_id)
+        for game_id in self.game_ids:
+            teams = self.info[game_id]
+            if teams['home'] and teams['away']:
+                self.by_matchup.setdefault(frozenset((teams['home'], teams['away'])), []).append(game_id)
+
+    def __len__(self):
+        return len(self.game_ids)
+
+    def __iter__(self):
+        return iter(self.game_ids)
+
+    def team_abbreviation(self, team):
+        """Accept an abbreviation ('GSW'), a full team name ('Golden State Warriors') or part of one ('Warriors')
+
+        :param team: The team
+        :return: The team's abbreviation
+        :raises KeyError: If no team in the season matches
+        """
+        key = str(team).lower()
+        for abbreviation in self.by_team:
+            if abbreviation and abbreviation.lower() == key:
+                return abbreviation
+        if key in self.team_names:
+            return self.team_names[key]
+        for team_name, abbreviation in self.team_names.items():
+            if key in team_name:
+                return abbreviation
+        raise KeyError('No team matching {!r} in this season'.format(team))
+
+    def games_for(self, team, home=None):
+        """A team's games in season order
+
+        :param team: Abbreviation or full name
+        :param home: True for home games only, False for away games only, None for both
+        :return: A list of GAME_IDs
+        """
+        team = self.team_abbreviation(team)
+        source = self.by_team if home is None else self.home_games if home else self.away_games
+        return list(source.get(team, []))
+
+    def games_between(self, team, opponent):
+        return list(self.by_matchup.get(frozenset((self.team_abbreviation(team), self.team_abbreviation(opponent))),
+                                        []))
+
+    def select(self, team=None, home=None, opponent=None, date_from=None, date_to=None, month=None):
+        """Filter the season, e.g. select(team='GSW', home=True, month=3) for every Warriors home game in March
+
+        :param team: Only games this team played
+        :param home: With team, True for its home games and False for its away games
+        :param opponent: With team, only games against this opponent
+        :param date_from: Only games on or after this date, YYYY-MM-DD
+        :param date_to: Only games on or before this date, YYYY-MM-DD
+        :param month: Only games in this calendar month, 1-12
+        :return: A list of GAME_IDs in season order
+        """
+        if team is not None and opponent is not None:
+            game_ids = self.games_between(team, opponent)
+            if home is not None:
+                home_games = set(self.games_for(team, home))
+                game_ids = [game_id for game_id in game_ids if game_id in home_games]
+        elif team is not None:
+            game_ids = self.games_for(team, home)
+        else:
+            game_ids = self.game_ids
+        selected = []
+        for game_id in game_ids:
+            game_date = self.info[game_id]['date'] or ''
+            if (date_from and game_date < date_from) or (date_to and game_date > date_to) or \
+                    (month and game_date[5:7] != '{:02d}'.format(month)):
+                continue
+            selected.append(game_id)
+        return selected
+
+
 class GameList(Stat):
 
+    endpoint = endpoints['GameList']
+    index_cache = {}
+
     def __init__(self, **kwargs):
-        params = {'Counter': '1000', 'Direction': 'DESC', 'LeagueID': '00', 'PlayerOrTeam': 'T', 'Season': '2015-16',
-                  'SeasonType': 'Regular Season', 'Sorter': 'PTS'}
-        super().__init__('http://stats.nba.com/stats/leaguegamelog?', params, kwargs)
+        self._index = None
+        super().__init__(self.endpoint.url, self.endpoint.params, kwargs)
+
+    def zip_data_as_list(self):
+        result_sets = super().zip_data_as_list()
+        self._games = result_sets[0] if result_sets else None
+        self._index = SeasonGameIndex(self._games)
+        return list(self._index.game_ids)
+
+    @property
+    def games(self):
+        """The full team game log rows behind the list of game IDs"""
+        self.ensure_loaded()
+        return self._games
 
-        self.list = self.remove_duplicates(self.list[0])
+    @property
+    def index(self):
+        """The season's SeasonGameIndex"""
+        self.ensure_loaded()
+        return self._index
+
+    @classmethod
+    def season_index(cls, season, season_type='Regular Season', refresh=False):
+        """Get a season's SeasonGameIndex, fetching the game list only the first time it's asked for in this process
+
+        :param season: Season in YYYY-YY format
+        :param season_type: 'Regular Season' or 'Playoffs'
+        :param refresh: Fetch the game list again even if it's cached
+        :return: The SeasonGameIndex
+        """
+        key = (season, season_type)
+        if refresh or key not in cls.index_cache:
+            cls.index_cache[key] = cls(Season=season, SeasonType=season_type).index
+        return cls.index_cache[key]
 
     @staticmethod
     def remove_duplicates(game_list):
         fixed_list = []
+        seen = set()
         if game_list:
-            for item in game_list:
-                if not item['GAME_ID'] in fixed_list:
-                    fixed_list.append(item['GAME_ID'])
+            game_ids = game_list.column('GAME_ID') if isinstance(game_list, ResultSet) else \
+                [item['GAME_ID'] for item in game_list]
+            for game_id in game_ids:
+                if game_id not in seen:
+                    seen.add(game_id)
+                    fixed_list.append(game_id)
 
         return fixed_list
 
 
+class PlayIndex:
+    """Play-by-play indexed by period and elapsed seconds, for "plays within N seconds after X" queries
+
+    Every PCTIMESTRING is parsed once when the index is built; window queries are then two bisects.
+    """
+
+    def __init__(self, plays):
+        """Build the index
+
+        :param plays: The play-by-play ResultSet
+        """
+        self.plays = plays
+        self.period_keys, self.period_rows = {}, {}
+        self.game_keys, self.game_rows = [], []
+        parsed = {}
+        entries = []
+        for row, (period, clock) in enumerate(zip(plays.column('PERIOD'), plays.column('PCTIMESTRING'))):
+            if clock not in parsed:
+                parsed[clock] = self.clock_to_seconds(clock)
+            if parsed[clock] is None or period is None:
+                continue
+            entries.append((self.period_start(period) + self.period_length(period) - parsed[clock], period, row))
+        entries.sort()
+        for game_elapsed, period, row in entries:
+            self.game_keys.append(game_elapsed)
+            self.game_rows.append(row)
+            self.period_keys.setdefault(period, []).append(game_elapsed)
+            self.period_rows.setdefault(period, []).append(row)
+
+    @staticmethod
+    def period_length(period):
+        return 12 * 60 if period <= 4 else 5 * 60
+
+    @classmethod
+    def period_start(cls, period):
+        return sum(cls.period_length(earlier) for earlier in range(1, period))
+
+    @staticmethod
+    def clock_to_seconds(clock):
+        """Convert a game clock like '11:42' into seconds remaining in the period
+
+        :return: The seconds, or None if the clock can't be read
+        """
+        try:
+            minutes, seconds = str(clock).split(':')
+            return int(minutes) * 60 + int(seconds)
+        except ValueError:
+            return None
+
+    def elapsed(self, period, clock):
+        """Seconds since tip-off at a given period and game clock"""
+        return self.period_start(period) + self.period_length(period) - self.clock_to_seconds(clock)
+
+    def window(self, period, clock, seconds_after, same_period=True):
+        """All plays from a moment in the game to seconds_after later, in game order
+
+        :param period: The period the window starts in
+        :param clock: The game clock the window starts at, e.g. '5:31'
+        :param seconds_after: How long the window is
+        :param same_period: Stop the window at the end of the period, as TechnicalEffects always has
+        :return: A list of Rows
+        """
+        start = self.elapsed(period, clock)
+        keys, rows = (self.period_keys.get(period, []), self.period_rows.get(period, [])) if same_period else \
+            (self.game_keys, self.game_rows)
+        return [self.plays[row] for row in
+                sorted(rows[bisect_left(keys, start):bisect_right(keys, start + seconds_after)])]
+
+
 class Game(Stat):
 
+    endpoint = endpoints['Game']
+    event_types = {1: 'made_shots', 2: 'missed_shots', 3: 'free_throws', 4: 'rebounds', 5: 'turnovers', 6: 'fouls',
+                   7: 'violations', 8: 'substitutions', 9: 'timeouts', 10: 'jump_balls', 11: 'ejections'}
+    technical_pattern = re.compile(r't\.foul', re.IGNORECASE)
+    three_seconds_pattern = re.compile(r'3 sec', re.IGNORECASE)
+    flagrant_pattern = re.compile(r'flagrant', re.IGNORECASE)
+
     def __init__(self, gameID, **kwargs):
-        params = {'EndPeriod': '10', 'EndRange': '55800', 'GameID': gameID, 'RangeType': '2', 'Season': '2015-16',
-                  'SeasonType': 'Regular Season', 'StartPeriod': '1', 'StartRange': '0'}
-        super().__init__('http://stats.nba.com/stats/playbyplayv2?', params, kwargs)
+        self._play_index = None
+        self.events, self.home_team, self.away_team = {}, None, None
+        super().__init__(self.endpoint.url, self.endpoint.params, dict({'GameID': gameID}, **kwargs))
+
+    def load(self, data):
+        self._play_index = None
+        super().load(data)
+        self.classify_events()
+        return self
+
+    def classify_events(self):
+        """One pass over the plays that indexes them by event type and finds the teams
+
+        Event types come from EVENTMSGTYPE (made_shots, fouls, turnovers, substitutions, ...); technicals and
+        flagrants are picked out of the descriptions, the way tech_list always has.
+
+        :return: None
+        """
+        self.events, self.home_team, self.away_team = {}, None, None
+        plays = self.result_set(0)
+        if plays is None:
+            return
+        empty = [None] * len(plays)
+        columns = [plays.column(header) if plays.has_column(header) else empty for header in
+                   ('HOMEDESCRIPTION', 'VISITORDESCRIPTION', 'EVENTMSGTYPE', 'PLAYER1_TEAM_ABBREVIATION')]
+        for row, (home, visitor, msg_type, team) in enumerate(zip(*columns)):
+            event_type = self.event_types.get(msg_type)
+            if event_type:
+                self.events.setdefault(event_type, []).append(row)
+            for description in (visitor, home):
+                if description and self.technical_pattern.search(description) and \
+                        not self.three_seconds_pattern.search(description):
+                    self.events.setdefault('technicals', []).append(row)
+                    break
+            if msg_type in (6, None) and any(description and self.flagrant_pattern.search(description)
+                                              for description in (visitor, home)):
+                self.events.setdefault('flagrants', []).append(row)
+            if home and self.home_team is None:
+                self.home_team = team
+            if visitor and self.away_team is None:
+                self.away_team = team
+
+    def events_of(self, event_type):
+        """All plays of one event type, e.g. game.events_of('turnovers')
+
+        :param event_type: A name from Game.event_types, or 'technicals' / 'flagrants'
+        :return: A list of Rows in game order
+        """
+        plays = self.result_set(0)
+        return [plays[row] for row in self.events.get(event_type, [])]
+
+    @property
+    def play_index(self):
+        """The game's plays indexed by period and elapsed time -- built on first use"""
+        if self._play_index is None:
+            self._play_index = PlayIndex(self.list[0])
+        return self._play_index
 
     @property
     def tech_list(self):
-        tech_list = []
-        for item in self.list[0]:
-            if item['VISITORDESCRIPTION'] and (item['VISITORDESCRIPTION'].lower().__contains__('t.foul') and not item['VISITORDESCRIPTION'].lower().__contains__('3 sec')):
-                tech_list.append(item)
-            elif item['HOMEDESCRIPTION'] and (item['HOMEDESCRIPTION'].lower().__contains__('t.foul') and not item['HOMEDESCRIPTION'].lower().__contains__('3 sec')):
-                tech_list.append(item)
-        return tech_list
+        return self.events_of('technicals')
 
     @property
     def away_home(self):
-        home = [item['PLAYER1_TEAM_ABBREVIATION'] for item in self.list[0] if item['HOMEDESCRIPTION']][0]
-        away = [item['PLAYER1_TEAM_ABBREVIATION'] for item in self.list[0] if item['VISITORDESCRIPTION']][0]
+        self.ensure_loaded()
+        return [self.away_team, self.home_team]
+
 
-        return [away, home]
\ No newline at end of file
+__all__ = sorted(set(name for name in globals() if not name.startswith('_')) | set(endpoints))
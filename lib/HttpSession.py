@@ -0,0 +1,215 @@
+import gzip
+import json
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from lib.ResponseCache import ResponseCache, set_cache
+from lib.RequestScheduler import RequestScheduler, set_scheduler
+
+
+default_headers = {'Accept-Encoding': 'gzip, deflate', 'Connection': 'keep-alive',
+                   'User-Agent': 'Mozilla/5.0 (compatible; NBAStatsV2)'}
+
+
+def create_session(pool_size=20, pool_block=False, headers=None):
+    """Build a requests session that keeps connections alive and reuses them across threads
+
+    :param pool_size: How many connections to keep open per host -- should be at least the number of worker threads
+    :param pool_block: Whether threads wait for a free connection instead of opening a throwaway one past pool_size
+    :param headers: Extra headers to send with every request
+    :return: The session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=pool_block)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(default_headers)
+    session.headers.update(headers or {})
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """The session every Stat and News request goes through -- created on first use
+
+    :return: The shared session, or whatever was injected with set_session
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def set_session(session):
+    """Swap the shared session -- anything with a requests-style get(url, params=, timeout=) works, so tests can
+    pass in a local transport
+
+    :param session: The new session, or None to build a default one on next use
+    :return: The previous session
+    """
+    global _session
+    with _session_lock:
+        previous, _session = _session, session
+    return previous
+
+
+def configure_session(pool_size=20, pool_block=False, headers=None):
+    """Replace the shared session with a freshly configured one
+
+    :return: The new session
+    """
+    session = create_session(pool_size, pool_block, headers)
+    previous = set_session(session)
+    if previous is not None and hasattr(previous, 'close'):
+        previous.close()
+    return session
+
+
+class ArchivedResponse:
+    """Stand-in for requests.Response built from a recorded request"""
+
+    def __init__(self, url, status_code, text):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+
+    @property
+    def content(self):
+        return self.text.encode('utf-8')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        content = self.content
+        for start in range(0, len(content), chunk_size):
+            yield content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError('{} for url: {}'.format(self.status_code, self.url), response=self)
+
+
+class RecordingSession:
+    """Session wrapper that passes requests through and keeps every request -> response pair for save()"""
+
+    def __init__(self, session=None):
+        self.session = session or create_session()
+        self.records = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        response = self.session.get(url, params=params, **kwargs)
+        with self._lock:
+            self.records[ResponseCache.key(url, params)] = {'url': url, 'params': params, 'final_url': response.url,
+                                                            'status': response.status_code, 'body': response.text}
+        return response
+
+    def save(self, path):
+        """Write the recorded pairs to a gzip-compressed JSON-lines archive
+
+        :param path: Where to write the archive
+        :return: Number of requests written
+        """
+        with self._lock:
+            records = list(self.records.values())
+        with gzip.open(str(path), 'wt', encoding='utf-8') as archive:
+            for record in records:
+                archive.write(json.dumps(record, separators=(',', ':')) + '\n')
+        return len(records)
+
+    def close(self):
+        if hasattr(self.session, 'close'):
+            self.session.close()
+
+
+class ReplayMiss(requests.RequestException):
+    """Raised by ReplaySession for a request that isn't in the archive -- the scheduler doesn't retry it"""
+
+
+class ReplaySession:
+    """Session that serves responses from an archive written by RecordingSession -- never touches the network
+
+    Requests that aren't in the archive fail straight away with ReplayMiss.
+    """
+
+    def __init__(self, path, latency=0):
+        """Load an archive
+
+        :param path: The archive written by RecordingSession.save
+        :param latency: Seconds to sleep before each response, to make replays behave more like the live site
+        """
+        self.latency = latency
+        self.records = {}
+        self.served = 0
+        self.missed = 0
+        self._lock = threading.Lock()
+        with gzip.open(str(path), 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                record = json.loads(line)
+                self.records[ResponseCache.key(record['url'], record['params'])] = record
+
+    def get(self, url, params=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        record = self.records.get(ResponseCache.key(url, params))
+        with self._lock:
+            if record is None:
+                self.missed += 1
+            else:
+                self.served += 1
+        if record is None:
+            raise ReplayMiss('No recorded response for {} {}'.format(url, params))
+        return ArchivedResponse(record['final_url'], record['status'], record['body'])
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def recording(path, session=None):
+    """Record every request made inside the block to an archive -- the response cache is bypassed so nothing is missed
+
+    :param path: Where to write the archive when the block exits
+    :param session: The session to record through, or None for a fresh pooled one
+    """
+    recorder = RecordingSession(session)
+    previous_session, previous_cache = set_session(recorder), set_cache(ResponseCache())
+    try:
+        yield recorder
+    finally:
+        set_session(previous_session)
+        set_cache(previous_cache)
+        recorder.save(path)
+
+
+@contextmanager
+def replaying(path, latency=0):
+    """Serve every request made inside the block from an archive, without the response cache, rate limiting or retries
+
+    :param path: The archive written by recording()
+    :param latency: Seconds to sleep before each response
+    """
+    replayer = ReplaySession(path, latency)
+    previous_session, previous_cache = set_session(replayer), set_cache(ResponseCache())
+    previous_scheduler = set_scheduler(RequestScheduler(rate=None, retries=0))
+    try:
+        yield replayer
+    finally:
+        set_session(previous_session)
+        set_cache(previous_cache)
+        set_scheduler(previous_scheduler)
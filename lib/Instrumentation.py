@@ -0,0 +1,198 @@
+import threading
+from urllib.parse import urlsplit
+
+
+latency_buckets = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+
+def endpoint_name(url):
+    """Short name for an endpoint -- playbyplayv2 for a stats URL, the feed name for a News feed
+
+    :param url: The request URL
+    :return: The name
+    """
+    parts = [part for part in urlsplit(url).path.split('/') if part]
+    if not parts:
+        return url
+    if parts[-1].endswith('.js') and len(parts) > 1:
+        return parts[-2]
+    return parts[-1]
+
+
+class EndpointStats:
+    """Running totals for one endpoint"""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.failures = 0
+        self.bytes = 0
+        self.rows = 0
+        self.parses = 0
+        self.latency_seconds = 0.0
+        self.decode_seconds = 0.0
+        self.zip_seconds = 0.0
+        self.latency_histogram = [0] * len(latency_buckets)
+
+    def add_latency(self, seconds):
+        self.latency_seconds += seconds
+        for index, bound in enumerate(latency_buckets):
+            if seconds <= bound:
+                self.latency_histogram[index] += 1
+                break
+
+    def latency_percentile(self, percentile):
+        """Upper bound of the histogram bucket the percentile falls in
+
+        :param percentile: 0-100
+        :return: Seconds, or None if there were no requests
+        """
+        total = sum(self.latency_histogram)
+        if not total:
+            return None
+        needed, seen = total * percentile / 100, 0
+        for bound, count in zip(latency_buckets, self.latency_histogram):
+            seen += count
+            if seen >= needed:
+                return bound
+        return latency_buckets[-1]
+
+    @property
+    def total_seconds(self):
+        return self.latency_seconds + self.decode_seconds + self.zip_seconds
+
+    def to_dict(self):
+        attempts = sum(self.latency_histogram)
+        return {'endpoint': self.endpoint, 'requests': self.requests, 'cache_hits': self.cache_hits,
+                'coalesced': self.coalesced, 'retries': self.retries, 'failures': self.failures, 'bytes': self.bytes,
+                'rows': self.rows, 'latency_seconds': self.latency_seconds,
+                'mean_latency': self.latency_seconds / attempts if attempts else None,
+                'p50_latency': self.latency_percentile(50), 'p95_latency': self.latency_percentile(95),
+                'decode_seconds': self.decode_seconds, 'zip_seconds': self.zip_seconds,
+                'latency_histogram': dict(zip((str(bound) for bound in latency_buckets), self.latency_histogram))}
+
+
+class Instrumentation:
+    """Per-endpoint request, cache and parse statistics for every Stat and News request
+
+    Hooks are called with an event dict for everything recorded -- event is 'request', 'cache_hit', 'coalesced' or
+    'parse', endpoint and url are always set, and the rest depends on the event.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self.hooks = []
+        self._lock = threading.Lock()
+
+    def add_hook(self, hook):
+        """Call hook(event) for every event from now on
+
+        :param hook: A callable taking one event dict
+        :return: The hook, for remove_hook
+        """
+        with self._lock:
+            self.hooks = self.hooks + [hook]
+        return hook
+
+    def remove_hook(self, hook):
+        with self._lock:
+            self.hooks = [existing for existing in self.hooks if existing is not hook]
+
+    def reset(self):
+        with self._lock:
+            self.endpoints = {}
+
+    def endpoint(self, url):
+        name = endpoint_name(url)
+        if name not in self.endpoints:
+            self.endpoints[name] = EndpointStats(name)
+        return self.endpoints[name]
+
+    def emit(self, event):
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as error:
+                print('Instrumentation hook {!r} failed: {!r}'.format(hook, error))
+
+    def record_fetch(self, result):
+        """Record a request sent through the RequestScheduler
+
+        :param result: Its FetchResult
+        :return: None
+        """
+        with self._lock:
+            stats = self.endpoint(result.url)
+            stats.requests += 1
+            stats.retries += max(result.attempts - 1, 0)
+            stats.failures += 0 if result.ok else 1
+            stats.bytes += result.bytes
+            stats.decode_seconds += result.decode_seconds
+            for seconds in result.latencies:
+                stats.add_latency(seconds)
+        self.emit({'event': 'request', 'endpoint': stats.endpoint, 'url': result.url, 'params': result.params,
+                   'ok': result.ok, 'status': result.status, 'error': result.error, 'attempts': result.attempts,
+                   'latencies': result.latencies, 'bytes': result.bytes, 'decode_seconds': result.decode_seconds})
+
+    def record_cache_hit(self, url, params):
+        with self._lock:
+            stats = self.endpoint(url)
+            stats.cache_hits += 1
+        self.emit({'event': 'cache_hit', 'endpoint': stats.endpoint, 'url': url, 'params': params})
+
+    def record_coalesced(self, url, params):
+        with self._lock:
+            stats = self.endpoint(url)
+            stats.coalesced += 1
+        self.emit({'event': 'coalesced', 'endpoint': stats.endpoint, 'url': url, 'params': params})
+
+    def record_parse(self, url, seconds, rows, streamed_bytes=0):
+        """Record turning a response into ResultSets
+
+        :param url: The endpoint URL
+        :param seconds: Time spent in zip_data_as_list, or streaming the rows out of the body
+        :param rows: Rows across every result set
+        :param streamed_bytes: Body bytes read while streaming -- streamed requests are recorded before the body is read
+        :return: None
+        """
+        with self._lock:
+            stats = self.endpoint(url)
+            stats.parses += 1
+            stats.zip_seconds += seconds
+            stats.rows += rows
+            stats.bytes += streamed_bytes
+        self.emit({'event': 'parse', 'endpoint': stats.endpoint, 'url': url, 'seconds': seconds, 'rows': rows,
+                   'bytes': streamed_bytes})
+
+    def summary(self):
+        """Every endpoint's totals, the ones that took longest first
+
+        :return: A list of dicts
+        """
+        with self._lock:
+            endpoints = sorted(self.endpoints.values(), key=lambda stats: -stats.total_seconds)
+            return [stats.to_dict() for stats in endpoints]
+
+    def print_summary(self):
+        summary = self.summary()
+        if not summary:
+            return
+        print('{:<32} {:>8} {:>6} {:>6} {:>7} {:>6} {:>10} {:>9} {:>9} {:>9} {:>8} {:>8}'.format(
+            'endpoint', 'requests', 'cached', 'shared', 'retries', 'failed', 'KiB', 'rows', 'fetch s', 'p95 s',
+            'decode s', 'zip s'))
+        for stats in summary:
+            print('{:<32} {:>8} {:>6} {:>6} {:>7} {:>6} {:>10.1f} {:>9} {:>9.2f} {:>9} {:>8.2f} {:>8.2f}'.format(
+                stats['endpoint'][:32], stats['requests'], stats['cache_hits'], stats['coalesced'], stats['retries'],
+                stats['failures'], stats['bytes'] / 1024, stats['rows'], stats['latency_seconds'],
+                '-' if stats['p95_latency'] is None else '<={}'.format(stats['p95_latency']),
+                stats['decode_seconds'], stats['zip_seconds']))
+
+
+_instrumentation = Instrumentation()
+
+
+def get_instrumentation():
+    return _instrumentation
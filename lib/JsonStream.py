@@ -0,0 +1,184 @@
+import codecs
+import json
+
+
+class JsonStream:
+    """Incremental reader over a JSON document that arrives in chunks -- only the value being read is kept in memory"""
+
+    decoder = json.JSONDecoder()
+    whitespace = ' \t\n\r'
+
+    def __init__(self, chunks, encoding='utf-8'):
+        """Wrap a chunk iterator
+
+        :param chunks: Iterable of bytes (or str) chunks, e.g. response.iter_content(65536)
+        :param encoding: Encoding of byte chunks
+        """
+        self.chunks = iter(chunks)
+        self.text_decoder = codecs.getincrementaldecoder(encoding)()
+        self.buffer = ''
+        self.pos = 0
+        self.exhausted = False
+
+    def refill(self, wanted=1):
+        """Append at least `wanted` more characters to the buffer, dropping what's already been read
+
+        :return: False once the input has run out
+        """
+        if self.pos > 65536:
+            self.buffer, self.pos = self.buffer[self.pos:], 0
+        added = 0
+        while added < wanted and not self.exhausted:
+            try:
+                chunk = next(self.chunks)
+            except StopIteration:
+                self.exhausted = True
+                chunk = self.text_decoder.decode(b'', final=True)
+            else:
+                if isinstance(chunk, bytes):
+                    chunk = self.text_decoder.decode(chunk)
+            self.buffer += chunk
+            added += len(chunk)
+        return added > 0
+
+    def peek(self):
+        """The next non-whitespace character, without consuming it
+
+        :return: The character, or '' at the end of the input
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self.whitespace:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.refill():
+                return ''
+
+    def expect(self, characters):
+        """Consume the next character, which has to be one of characters
+
+        :return: The character
+        """
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError('Expected one of {!r} at offset {}, found {!r}'.format(characters, self.pos, character))
+        self.pos += 1
+        return character
+
+    def value(self):
+        """Decode the next complete JSON value
+
+        :return: The value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self.refill(len(self.buffer) - self.pos):
+                    raise
+                continue
+            if end < len(self.buffer) or self.exhausted or self.buffer[self.pos] in '{["':
+                self.pos = end
+                return value
+            self.refill()
+
+    def items(self):
+        """Walk the keys of the object starting here -- the caller has to read or skip each value before advancing
+
+        :return: A generator of keys
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def elements(self):
+        """Walk the elements of the array starting here -- the caller has to read or skip each one before advancing
+
+        :return: A generator that yields once per element
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            if self.expect(',]') == ']':
+                return
+
+
+def iter_result_sets(chunks):
+    """Stream the result sets of a stats.nba.com response without holding the whole body
+
+    Each result set comes out as (name, headers, rows), where rows is an iterator over the rowSet that decodes one row
+    at a time. Rows have to be consumed before moving on to the next result set -- whatever's left is skipped. Headers
+    are None for a result set that lists its rowSet before its headers.
+
+    :param chunks: Iterable of byte chunks, e.g. response.iter_content(65536)
+    :return: A generator of (name, headers, rows)
+    """
+    stream = JsonStream(chunks)
+    for key in stream.items():
+        if key not in ('resultSets', 'resultSet'):
+            stream.value()
+        elif stream.peek() == '[':
+            for _ in stream.elements():
+                yield from _stream_result_set(stream)
+        else:
+            yield from _stream_result_set(stream)
+
+
+def _stream_result_set(stream):
+    name = headers = None
+    for key in stream.items():
+        if key == 'rowSet' and stream.peek() == '[':
+            rows = RowStream(stream)
+            yield name, headers, rows
+            rows.skip()
+        elif key == 'name':
+            name = stream.value()
+        elif key == 'headers':
+            headers = stream.value()
+        else:
+            stream.value()
+
+
+class RowStream:
+    """Iterator over a rowSet that decodes one row per step"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.elements = stream.elements()
+        self.read = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        next(self.elements)
+        self.read += 1
+        return self.stream.value()
+
+    def skip(self):
+        for _ in self.elements:
+            self.stream.value()
+
+
+def iter_decoded_result_sets(data):
+    """Same output as iter_result_sets for a response that's already decoded, e.g. one from the response cache
+
+    :param data: The decoded JSON response
+    :return: A generator of (name, headers, rows)
+    """
+    result_sets = data.get('resultSets', data.get('resultSet')) if isinstance(data, dict) else None
+    if isinstance(result_sets, dict):
+        result_sets = [result_sets]
+    for item in result_sets or []:
+        yield item.get('name'), item.get('headers'), iter(item.get('rowSet') or [])
@@ -0,0 +1,278 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class FetchResult:
+    """Outcome of one request -- data on success, otherwise the error and HTTP status that caused the failure"""
+
+    def __init__(self, url, params, data=None, status=None, error=None, attempts=0, elapsed=0.0, cached=False):
+        self.url, self.params = url, params
+        self.data, self.status, self.error = data, status, error
+        self.attempts, self.elapsed, self.cached = attempts, elapsed, cached
+        self.latencies = []
+        self.bytes = 0
+        self.decode_seconds = 0.0
+        self.response = None
+
+    @property
+    def ok(self):
+        return self.error is None and (self.data is not None or self.response is not None)
+
+    def __repr__(self):
+        return 'FetchResult(url={!r}, ok={}, status={}, error={!r}, attempts={})'.format(
+            self.url, self.ok, self.status, self.error, self.attempts)
+
+
+class FetchError(Exception):
+    """Raised by Stat.raise_for_failure when a request gave up"""
+
+    def __init__(self, result):
+        super().__init__('{} failed after {} attempt(s): {}'.format(result.url, result.attempts, result.error))
+        self.result = result
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate, self.capacity = rate, capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, sleeping until one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that halves when the server pushes back and creeps back up while requests succeed"""
+
+    def __init__(self, initial, minimum=1, maximum=20):
+        self.limit, self.minimum, self.maximum = float(initial), minimum, maximum
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        """Free a slot and adjust the limit
+
+        :param throttled: Whether the request hit a 429, 5xx or timeout
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+class RequestScheduler:
+    """Sends every Stat/News request: per-host rate limiting, adaptive concurrency and retries with jittered backoff
+
+    Failures come back as a FetchResult with the error filled in instead of being swallowed.
+    """
+
+    retry_statuses = (429, 500, 502, 503, 504)
+
+    def __init__(self, rate=10.0, burst=10, concurrency=10, min_concurrency=1, max_concurrency=20, retries=3,
+                 backoff=0.5, max_backoff=30.0, timeout=10):
+        """Configure the scheduler
+
+        :param rate: Average requests per second per host, or None for no rate limit
+        :param burst: Requests per host that can go out back to back before the rate applies
+        :param concurrency: Starting number of requests in flight per host
+        :param min_concurrency: Floor the concurrency limit backs off to
+        :param max_concurrency: Ceiling the concurrency limit ramps up to
+        :param retries: Extra attempts after a retryable failure (429, 5xx, timeout, connection error)
+        :param backoff: Base delay before the first retry, doubled each attempt and jittered by +-50%
+        :param max_backoff: Longest delay between attempts
+        :param timeout: Per-request timeout in seconds
+        """
+        self.rate, self.burst = rate, burst
+        self.concurrency, self.min_concurrency, self.max_concurrency = concurrency, min_concurrency, max_concurrency
+        self.retries, self.backoff, self.max_backoff, self.timeout = retries, backoff, max_backoff, timeout
+        self.hosts = {}
+        self.counts = {'requests': 0, 'retries': 0, 'throttled': 0, 'failures': 0}
+        self._lock = threading.Lock()
+
+    def host_state(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.hosts:
+                self.hosts[host] = (TokenBucket(self.rate, self.burst) if self.rate else None,
+                                    AdaptiveLimiter(self.concurrency, self.min_concurrency, self.max_concurrency))
+            return self.hosts[host]
+
+    def count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def retry_delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            try:
+                return min(self.max_backoff, float(retry_after))
+            except ValueError:
+                pass
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def fetch(self, url, params, session=None, timeout=None, stream=False):
+        """Send a GET and decode the JSON, retrying what's worth retrying
+
+        :param url: The endpoint URL
+        :param params: The request parameters
+        :param session: Session to send through, or None for the shared one
+        :param timeout: Per-request timeout, or None for the scheduler's default
+        :param stream: Leave the body unread -- the FetchResult gets the open response instead of data, and retries
+        only cover getting the response headers
+        :return: A FetchResult
+        """
+        import requests
+        from lib.HttpSession import get_session
+        bucket, limiter = self.host_state(url)
+        session = session or get_session()
+        started = time.time()
+        result = FetchResult(url, params)
+        for attempt in range(self.retries + 1):
+            result.attempts = attempt + 1
+            retry_after, retryable = None, False
+            if bucket:
+                bucket.acquire()
+            limiter.acquire()
+            self.count('requests')
+            sent = time.perf_counter()
+            try:
+                response = session.get(url, params=params, timeout=timeout or self.timeout,
+                                       **({'stream': True} if stream else {}))
+                result.latencies.append(time.perf_counter() - sent)
+                result.status = getattr(response, 'status_code', 200)
+                if result.status >= 400:
+                    retryable = result.status in self.retry_statuses
+                    retry_after = getattr(response, 'headers', {}).get('Retry-After') if retryable else None
+                    result.error = 'HTTP {}'.format(result.status)
+                    if stream:
+                        response.close()
+                elif stream:
+                    result.response, result.error = response, None
+                else:
+                    result.bytes += len(getattr(response, 'content', b''))
+                    decoding = time.perf_counter()
+                    try:
+                        result.data, result.error = response.json(), None
+                    except ValueError as error:
+                        result.error = 'Invalid JSON from {}: {}'.format(getattr(response, 'url', url), error)
+                    finally:
+                        result.decode_seconds += time.perf_counter() - decoding
+            except (requests.Timeout, requests.ConnectionError) as error:
+                result.latencies.append(time.perf_counter() - sent)
+                retryable, result.error = True, '{}: {}'.format(type(error).__name__, error)
+            except (requests.RequestException, ValueError) as error:
+                result.error = '{}: {}'.format(type(error).__name__, error)
+            finally:
+                limiter.release(throttled=retryable)
+            if not retryable:
+                break
+            self.count('throttled')
+            if attempt < self.retries:
+                self.count('retries')
+                time.sleep(self.retry_delay(attempt, retry_after))
+        if not result.ok:
+            self.count('failures')
+        result.elapsed = time.time() - started
+        return result
+
+
+_scheduler = RequestScheduler()
+
+
+def get_scheduler():
+    return _scheduler
+
+
+def set_scheduler(scheduler):
+    """Swap the shared scheduler, e.g. RequestScheduler(rate=2, retries=5) for a gentle overnight rebuild
+
+    :return: The previous scheduler
+    """
+    global _scheduler
+    previous, _scheduler = _scheduler, scheduler
+    return previous
+
+
+class _Flight:
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Lets concurrent callers asking for the same key share one call -- the first caller runs it, the rest wait for
+    its result
+
+    The async path shares it too, since Stat.fetch_async runs the request in an executor thread.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.calls = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+
+    def do(self, key, func):
+        """Run func for key, or wait for the identical call that's already running
+
+        :param key: Identifies the call, e.g. ResponseCache.key(url, params)
+        :param func: The call to make -- takes no arguments
+        :return: (func's result, whether it came from another caller's call)
+        """
+        with self._lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+                self.calls += 1
+            else:
+                self.saved += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = func()
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self.flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'saved': self.saved, 'in_flight': len(self.flights)}
+
+
+_flights = SingleFlight()
+
+
+def get_flights():
+    return _flights
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+
+
+class ResponseCache:
+    """Base response cache -- stores nothing, but keeps the interface and counters every cache shares
+
+    Subclasses override load/store/discard; get/set handle keys, TTLs and hit/miss counting.
+    """
+
+    # Seconds to keep a response for, per endpoint. None means keep it forever.
+    default_ttls = {'scoreboardV2': 60, 'playoffpicture': 10 * 60}
+    current_season_ttl = 15 * 60
+    feed_ttl = 15 * 60
+
+    def __init__(self, ttls=None):
+        self.ttls = dict(self.default_ttls, **(ttls or {}))
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._counter_lock = threading.Lock()
+
+    @staticmethod
+    def endpoint_name(url):
+        return url.rstrip('?/').rsplit('/', 1)[-1]
+
+    @staticmethod
+    def key(url, params):
+        """Canonical cache key for a request -- parameter order and value types don't matter
+
+        :param url: The endpoint URL
+        :param params: The request parameters, or None
+        :return: A hex digest identifying the request
+        """
+        canonical = [url.rstrip('?')] + sorted((str(k), str(v)) for k, v in (params or {}).items())
+        return hashlib.sha1(json.dumps(canonical).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def season_start_year(params):
+        """Find the starting year of the season a request is for
+
+        :param params: The request parameters
+        :return: The year the season started in, or None if the request isn't tied to a season
+        """
+        for name, value in (params or {}).items():
+            value = str(value)
+            if name.lower() in ('season', 'seasonyear') and value[:4].isdigit():
+                return int(value[:4])
+            if name == 'SeasonID' and value[1:5].isdigit():
+                return int(value[1:5])
+        return None
+
+    @staticmethod
+    def current_season_start_year(today=None):
+        today = today or date.today()
+        return today.year if today.month >= 10 else today.year - 1
+
+    def ttl_for(self, url, params):
+        """How long a response can be kept -- finished seasons never change, the current season and live data do
+
+        :param url: The endpoint URL
+        :param params: The request parameters
+        :return: Seconds to keep the response, or None to keep it forever
+        """
+        endpoint = self.endpoint_name(url)
+        if endpoint in self.ttls:
+            return self.ttls[endpoint]
+        if '/feeds/' in url:
+            return self.feed_ttl
+        season = self.season_start_year(params)
+        if season is not None and season < self.current_season_start_year():
+            return None
+        return self.current_season_ttl
+
+    def get(self, url, params):
+        """Get a cached response
+
+        :param url: The endpoint URL
+        :param params: The request parameters
+        :return: The decoded JSON, or None on a miss
+        """
+        data = self.load(self.key(url, params))
+        with self._counter_lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, url, params, data):
+        """Store a response, unless the endpoint is configured not to be cached (a TTL of 0)
+
+        :param url: The endpoint URL
+        :param params: The request parameters
+        :param data: The decoded JSON
+        :return: None
+        """
+        ttl = self.ttl_for(url, params)
+        if data is None or ttl == 0:
+            return
+        self.store(self.key(url, params), data, None if ttl is None else time.time() + ttl)
+        with self._counter_lock:
+            self.stores += 1
+
+    @property
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'stores': self.stores}
+
+    def load(self, key):
+        return None
+
+    def store(self, key, data, expires):
+        pass
+
+    def discard(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+class DiskCache(ResponseCache):
+    """Response cache kept as one JSON file per request, evicting the least recently used entries past max_bytes"""
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, ttls=None):
+        super().__init__(ttls)
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = None
+        self._lock = threading.RLock()
+
+    def _file(self, key):
+        return self.path / '{}.json'.format(key)
+
+    def _load_entries(self):
+        """Build the LRU order from what is already on disk -- done once, on first use
+
+        :return: An OrderedDict of key -> size, least recently used first
+        """
+        if self._entries is None:
+            found = []
+            if self.path.is_dir():
+                for entry in os.scandir(str(self.path)):
+                    if entry.name.endswith('.json'):
+                        entry_stat = entry.stat()
+                        found.append((entry_stat.st_mtime, entry.name[:-len('.json')], entry_stat.st_size))
+            self._entries = OrderedDict((key, size) for _, key, size in sorted(found))
+            self.total_bytes = sum(self._entries.values())
+        return self._entries
+
+    def load(self, key):
+        """Read an entry -- only the LRU bookkeeping is done under the lock, so hits from many threads read in parallel
+
+        :param key: The cache key
+        :return: The cached data, or None on a miss
+        """
+        with self._lock:
+            if key not in self._load_entries():
+                return None
+        try:
+            with self._file(key).open('r', encoding='utf-8') as cache_file:
+                entry = json.load(cache_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self.discard(key)
+            return None
+        if entry['expires'] is not None and entry['expires'] < time.time():
+            self.discard(key)
+            return None
+        with self._lock:
+            entries = self._load_entries()
+            if key in entries:
+                entries.move_to_end(key)
+        try:
+            os.utime(str(self._file(key)))
+        except OSError:
+            pass
+        return entry['data']
+
+    def store(self, key, data, expires):
+        body = json.dumps({'expires': expires, 'data': data}, separators=(',', ':')).encode('utf-8')
+        with self._lock:
+            entries = self._load_entries()
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.path / '{}.{}.tmp'.format(key, threading.get_ident())
+            with tmp_file.open('wb') as cache_file:
+                cache_file.write(body)
+            os.replace(str(tmp_file), str(self._file(key)))
+            self.total_bytes += len(body) - entries.pop(key, 0)
+            entries[key] = len(body)
+            self.evict()
+
+    def discard(self, key):
+        with self._lock:
+            entries = self._load_entries()
+            self.total_bytes -= entries.pop(key, 0)
+            try:
+                self._file(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes
+
+        :return: None
+        """
+        with self._lock:
+            entries = self._load_entries()
+            while self.total_bytes > self.max_bytes and entries:
+                self.discard(next(iter(entries)))
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._load_entries()):
+                self.discard(key)
+
+
+default_cache_path = Path(__file__).resolve().parents[1] / '.cache' / 'responses'
+_cache = DiskCache(default_cache_path)
+
+
+def get_cache():
+    """The cache used by every Stat and News request"""
+    return _cache
+
+
+def set_cache(cache):
+    """Swap the shared cache -- pass ResponseCache() to turn caching off
+
+    :param cache: A ResponseCache instance
+    :return: The previous cache
+    """
+    global _cache
+    previous, _cache = _cache, cache
+    return previous
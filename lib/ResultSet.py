@@ -0,0 +1,195 @@
+from collections.abc import Sequence, MutableMapping
+from numbers import Integral, Real
+
+
+def import_numpy():
+    """NumPy is only needed for the array exports, so it's imported on first use rather than with the module"""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('NumPy is required to export result sets as arrays -- pip install numpy')
+    return numpy
+
+
+def column_kind(values):
+    """Work out what kind of array a column fits in
+
+    :param values: The column's values
+    :return: 'bool', 'int', 'float' (ints with missing values become float so they can hold NaN) or 'str' / 'object'
+    """
+    kinds = set()
+    for value in values:
+        if value is None:
+            kinds.add('none')
+        elif isinstance(value, bool):
+            kinds.add('bool')
+        elif isinstance(value, Integral):
+            kinds.add('int')
+        elif isinstance(value, Real):
+            kinds.add('float')
+        elif isinstance(value, str):
+            kinds.add('str')
+        else:
+            return 'object'
+    has_missing = 'none' in kinds
+    kinds.discard('none')
+    if not kinds:
+        return 'float'
+    if kinds == {'int'}:
+        return 'float' if has_missing else 'int'
+    if kinds <= {'int', 'float'}:
+        return 'float'
+    if kinds == {'bool'} and not has_missing:
+        return 'bool'
+    if kinds == {'str'}:
+        return 'str'
+    return 'object'
+
+
+class ResultSet(Sequence):
+    """Columnar version of a stats.nba.com result set -- one list per header instead of one dict per row
+
+    Indexing or iterating gives Row views, which act like the dicts zip_data_as_list used to build (row['PTS']),
+    without copying the headers into every row.
+    """
+
+    def __init__(self, headers, row_set, name=None):
+        """Transpose a rowSet into columns
+
+        :param headers: The column names
+        :param row_set: The rows, as lists of values in header order
+        :param name: The name of the result set, if the response gave one
+        """
+        self.name = name
+        self.headers = list(headers)
+        self._index = {header: i for i, header in enumerate(self.headers)}
+        self._length = len(row_set)
+        self.columns = [list(column) for column in zip(*row_set)]
+        while len(self.columns) < len(self.headers):
+            self.columns.append([None] * self._length)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Row(self, i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('result set index out of range')
+        return Row(self, index)
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield Row(self, i)
+
+    def __repr__(self):
+        return 'ResultSet(name={!r}, headers={!r}, rows={})'.format(self.name, self.headers, self._length)
+
+    def column(self, header):
+        """All values for one header, in row order
+
+        :param header: The column name, e.g. 'PTS'
+        :return: The column's list -- changes to it show up in the rows
+        """
+        return self.columns[self._index[header]]
+
+    def has_column(self, header):
+        return header in self._index
+
+    def add_column(self, header, values=None):
+        """Add a new column, or replace an existing one
+
+        :param header: The column name
+        :param values: The values in row order, or None to fill it with None
+        :return: The column's list
+        """
+        values = [None] * self._length if values is None else list(values)
+        if header in self._index:
+            self.columns[self._index[header]] = values
+        else:
+            self._index[header] = len(self.headers)
+            self.headers.append(header)
+            self.columns.append(values)
+        return values
+
+    def column_array(self, header):
+        """One column as a typed NumPy array -- missing numbers become NaN, strings get a fixed-width unicode dtype
+
+        :param header: The column name
+        :return: A numpy.ndarray
+        """
+        numpy = import_numpy()
+        values = self.column(header)
+        kind = column_kind(values)
+        if kind == 'int':
+            return numpy.array(values, dtype=numpy.int64)
+        if kind == 'float':
+            return numpy.array([numpy.nan if value is None else value for value in values], dtype=numpy.float64)
+        if kind == 'bool':
+            return numpy.array(values, dtype=numpy.bool_)
+        if kind == 'str':
+            return numpy.array(['' if value is None else value for value in values], dtype=numpy.str_)
+        return numpy.array(values, dtype=object)
+
+    def numeric_headers(self):
+        return [header for header in self._index if column_kind(self.column(header)) in ('int', 'float', 'bool')]
+
+    def to_numpy(self, headers=None):
+        """Export columns as typed NumPy arrays, straight from the column lists
+
+        :param headers: The columns to export, or None for every numeric column
+        :return: A dict of header -> numpy.ndarray
+        """
+        return {header: self.column_array(header) for header in (headers or self.numeric_headers())}
+
+    def to_records(self, headers=None):
+        """Export columns as one NumPy record array, e.g. rs.to_records()['PTS'].mean()
+
+        :param headers: The columns to include, or None for all of them
+        :return: A numpy.recarray with one field per column
+        """
+        numpy = import_numpy()
+        headers = list(headers or self._index)
+        return numpy.rec.fromarrays([self.column_array(header) for header in headers], names=headers)
+
+    def to_dicts(self):
+        """Materialize every row as a plain dict, e.g. for json.dump
+
+        :return: A list of dicts
+        """
+        return [dict(zip(self._index, row)) for row in zip(*(self.columns[i] for i in self._index.values()))]
+
+
+class Row(MutableMapping):
+    """A dict-like view of one row of a ResultSet"""
+
+    __slots__ = ('result_set', 'index')
+
+    def __init__(self, result_set, index):
+        self.result_set = result_set
+        self.index = index
+
+    def __getitem__(self, header):
+        return self.result_set.columns[self.result_set._index[header]][self.index]
+
+    def __setitem__(self, header, value):
+        if not self.result_set.has_column(header):
+            self.result_set.add_column(header)
+        self.result_set.column(header)[self.index] = value
+
+    def __delitem__(self, header):
+        raise TypeError('Columns can only be removed from a whole ResultSet, copy the row with dict(row) first')
+
+    def __iter__(self):
+        return iter(self.result_set._index)
+
+    def __len__(self):
+        return len(self.result_set._index)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def to_dict(self):
+        return dict(self)
@@ -0,0 +1,168 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from lib.DataGather import GameList, Game
+from lib.ResultSet import ResultSet
+from lib import BatchFetch
+
+
+default_warehouse_path = Path(__file__).resolve().parents[1] / '.cache' / 'warehouse.sqlite3'
+
+
+class SeasonWarehouse:
+    """Local SQLite store of season game lists and play-by-play
+
+    Games are keyed by GAME_ID and season, plays by GAME_ID, EVENTNUM and PERIOD. ingest() only downloads the
+    play-by-play for games that aren't stored yet, so re-running it on a finished season costs one GameList request.
+    """
+
+    schema = '''
+        CREATE TABLE IF NOT EXISTS games (
+            game_id TEXT PRIMARY KEY, season TEXT NOT NULL, season_type TEXT NOT NULL, game_date TEXT,
+            play_headers TEXT, ingested_at REAL);
+        CREATE INDEX IF NOT EXISTS games_by_season ON games (season, season_type, game_date);
+        CREATE TABLE IF NOT EXISTS plays (
+            game_id TEXT NOT NULL, eventnum INTEGER NOT NULL, period INTEGER, season TEXT NOT NULL, row TEXT NOT NULL,
+            PRIMARY KEY (game_id, eventnum));
+        CREATE INDEX IF NOT EXISTS plays_by_period ON plays (game_id, period);
+        CREATE INDEX IF NOT EXISTS plays_by_season ON plays (season, game_id);
+    '''
+
+    def __init__(self, path=default_warehouse_path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.executescript(self.schema)
+
+    def close(self):
+        self._connection.close()
+
+    def _query(self, sql, args=()):
+        with self._lock:
+            return self._connection.execute(sql, args).fetchall()
+
+    def ingest(self, seasons, season_type='Regular Season', concurrency=20, chunk_size=200):
+        """Store the game list and play-by-play for every game in the given seasons that isn't stored yet
+
+        :param seasons: Seasons in YYYY-YY format
+        :param season_type: 'Regular Season' or 'Playoffs'
+        :param concurrency: Maximum number of play-by-play requests in flight
+        :param chunk_size: How many games to download before writing them out -- bounds memory use
+        :return: A dict of season -> number of games newly ingested
+        """
+        ingested = {}
+        for season in seasons:
+            self.store_game_list(GameList(Season=season, SeasonType=season_type), season, season_type)
+            missing = self.missing_game_ids(season, season_type)
+            ingested[season] = 0
+            for start in range(0, len(missing), chunk_size):
+                games = BatchFetch.gather(Game, missing[start:start + chunk_size], concurrency, Season=season,
+                                          SeasonType=season_type)
+                ingested[season] += sum(self.store_game(game, season) for game in games)
+        return ingested
+
+    def store_game_list(self, game_list, season, season_type='Regular Season'):
+        """Record every game in a GameList, keeping any play-by-play already stored for them
+
+        :param game_list: A loaded GameList
+        :param season: The season it was fetched for
+        :param season_type: The season type it was fetched for
+        :return: None
+        """
+        if not game_list.games:
+            return
+        dates = dict(zip(game_list.games.column('GAME_ID'), game_list.games.column('GAME_DATE'))) \
+            if game_list.games.has_column('GAME_DATE') else {}
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO games (game_id, season, season_type, game_date) VALUES (?, ?, ?, ?)',
+                [(game_id, season, season_type, dates.get(game_id)) for game_id in game_list.list])
+
+    def store_game(self, game, season):
+        """Write a loaded Game's play-by-play into the store
+
+        :param game: A loaded Game
+        :param season: The season the game is in
+        :return: True if the game was stored, False if it had no play-by-play to store
+        """
+        plays = game.result_set(0)
+        if plays is None or not len(plays):
+            return False
+        game_id = game.params['GameID']
+        eventnums, periods = plays.column('EVENTNUM'), plays.column('PERIOD')
+        rows = [json.dumps(list(row), separators=(',', ':')) for row in zip(*plays.columns)]
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM plays WHERE game_id = ?', (game_id,))
+            self._connection.executemany(
+                'INSERT INTO plays (game_id, eventnum, period, season, row) VALUES (?, ?, ?, ?, ?)',
+                [(game_id, eventnum, period, season, row) for eventnum, period, row in zip(eventnums, periods, rows)])
+            self._connection.execute(
+                'INSERT INTO games (game_id, season, season_type, play_headers, ingested_at) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (game_id) DO UPDATE SET play_headers = excluded.play_headers, '
+                'ingested_at = excluded.ingested_at',
+                (game_id, season, game.params.get('SeasonType', 'Regular Season'), json.dumps(plays.headers),
+                 time.time()))
+        return True
+
+    def game_ids(self, season, season_type='Regular Season', ingested_only=False):
+        """Every stored game for a season
+
+        :param season: Season in YYYY-YY format
+        :param season_type: 'Regular Season' or 'Playoffs'
+        :param ingested_only: Only include games whose play-by-play is stored
+        :return: A list of GAME_IDs in date order
+        """
+        sql = 'SELECT game_id FROM games WHERE season = ? AND season_type = ?'
+        if ingested_only:
+            sql += ' AND play_headers IS NOT NULL'
+        return [row[0] for row in self._query(sql + ' ORDER BY game_date, game_id', (season, season_type))]
+
+    def missing_game_ids(self, season, season_type='Regular Season'):
+        return [row[0] for row in self._query(
+            'SELECT game_id FROM games WHERE season = ? AND season_type = ? AND play_headers IS NULL '
+            'ORDER BY game_date, game_id', (season, season_type))]
+
+    def has_game(self, game_id):
+        return bool(self._query('SELECT 1 FROM games WHERE game_id = ? AND play_headers IS NOT NULL', (game_id,)))
+
+    def stored_rows(self, game_id, period=None):
+        """Stored play-by-play for a game, as it came in the response
+
+        :param game_id: The GAME_ID
+        :param period: Only return plays from this period, or None for the whole game
+        :return: (headers, rows) in event order, or None if the game isn't stored
+        """
+        headers = self._query('SELECT play_headers FROM games WHERE game_id = ?', (game_id,))
+        if not headers or headers[0][0] is None:
+            return None
+        sql, args = 'SELECT row FROM plays WHERE game_id = ?', (game_id,)
+        if period is not None:
+            sql, args = sql + ' AND period = ?', args + (period,)
+        return json.loads(headers[0][0]), [json.loads(row[0]) for row in self._query(sql + ' ORDER BY eventnum', args)]
+
+    def plays(self, game_id, period=None):
+        """Stored play-by-play for a game
+
+        :param game_id: The GAME_ID
+        :param period: Only return plays from this period, or None for the whole game
+        :return: A ResultSet in event order, or None if the game isn't stored
+        """
+        stored = self.stored_rows(game_id, period)
+        return ResultSet(stored[0], stored[1], 'PlayByPlay') if stored else None
+
+    def game(self, game_id, season):
+        """Build a Game from the store without touching the network
+
+        :param game_id: The GAME_ID
+        :param season: The season the game is in
+        :return: A loaded Game, or None if the game isn't stored
+        """
+        stored = self.stored_rows(game_id)
+        if stored is None:
+            return None
+        return Game(game_id, Season=season, lazy=True).load(
+            {'resultSets': [{'name': 'PlayByPlay', 'headers': stored[0], 'rowSet': stored[1]}]})
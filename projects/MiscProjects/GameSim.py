@@ -1,10 +1,15 @@
 from lib.DataGather import *
+from lib.BatchFetch import fetch_all
+from lib.ResultSet import import_numpy
 from random import choice
+import concurrent.futures
 
 
 class Game:
 
-    def __init__(self, team_one=None, team_two=None, **kwargs):
+    simulators = {}
+
+    def __init__(self, team_one=None, team_two=None, simulator=None, **kwargs):
         self.game_params = self.edit_params({'quarters': 4, 'shot_clock': 24, 'quarter_clock': '12', 'playoffs': False},
                                             kwargs)
         self.quarter, self.game_clock, self.quarter_clock, self.score = 1, 48, self.game_params['quarter_clock'], [0, 0]
@@ -15,9 +20,21 @@ class Game:
             self.team_one, self.team_two = team_one, team_two
 
         self.team_one_obj, self.team_two_obj = Team(self.team_one), Team(self.team_two)
+        self.simulator = simulator or self.shared_simulator()
 
         self.run_game()
 
+    @classmethod
+    def shared_simulator(cls, season='2015-16'):
+        """Get a season's MatchupSimulator, loading its tables only the first time it's asked for in this process
+
+        :param season: Season in YYYY-YY format
+        :return: The MatchupSimulator
+        """
+        if season not in cls.simulators:
+            cls.simulators[season] = MatchupSimulator(season)
+        return cls.simulators[season]
+
     def handle_team_names(self, team_one, team_two):
         team_one = self.gen_team() if not team_one else team_one
         team_two = self.gen_team() if not team_two else team_two
@@ -25,11 +42,10 @@ class Game:
         return team_one, team_two
 
     def run_game(self):
-        total_time_sec = int(self.game_params['quarter_clock']) * (60 * 4)
-        Play(self.quarter, self.quarter_clock, self.score)
-
-        # while total_time_sec > 0:
-        #pass
+        result = self.simulator.simulate(self.team_one, self.team_two, games=1)
+        self.score = [int(result.home_points[0]), int(result.away_points[0])]
+        self.quarter = 4 + int(result.overtimes[0])
+        print('{} {} - {} {}'.format(self.team_one, self.score[0], self.score[1], self.team_two))
 
     @staticmethod
     def edit_params(base_params, kwargs):
@@ -41,17 +57,30 @@ class Game:
 
     @staticmethod
     def gen_team():
-        lists_path = [str(path) for path in Path(os.getcwd()).parents if path.name == 'NBAStatsV2'][0]
-        with open(lists_path + '/lists/teamlist.txt', 'r') as team_file:
-            return choice([team.split(': ')[0] for team in team_file])
+        team_index = IdIndex.teams()
+        team_index.refresh()
+        return choice(team_index.names)
 
 
 class Team:
 
     def __init__(self, name):
         self.name = name
-        self.roster, self.record = self.get_roster(), self.get_record()
-        print(self.name, self.record)
+        self._roster, self._record = None, None
+
+    @property
+    def roster(self):
+        """The roster's player names -- requested the first time it's read"""
+        if self._roster is None:
+            self._roster = self.get_roster()
+        return self._roster
+
+    @property
+    def record(self):
+        """(wins, losses) -- requested the first time it's read"""
+        if self._record is None:
+            self._record = self.get_record()
+        return self._record
 
     def get_roster(self):
         roster_obj = TeamRoster(self.name)
@@ -80,3 +109,284 @@ class Shot:
         pass
 
 
+class TeamTables:
+    """Possession-level probabilities for every team, from the league-wide team totals and opponent totals
+
+    Each team gets an offensive table (how its possessions end) and a defensive one (how its opponents' possessions
+    end). A matchup combines the two with the league average: offense * defense / league.
+    """
+
+    rates = ('tov', 'ft_trip', 'three_share', 'fg2', 'fg3', 'oreb', 'pace')
+
+    def __init__(self, season='2015-16', result_sets=None):
+        """Load the tables
+
+        :param season: Season in YYYY-YY format
+        :param result_sets: Already-loaded (Base, Opponent) leaguedashteamstats Totals ResultSets, instead of requesting
+        :return: None
+        """
+        numpy = self.numpy = import_numpy()
+        if result_sets is None:
+            team_stats = fetch_all([LeagueTeamStats(Season=season, MeasureType=measure_type, PerMode='Totals',
+                                                    lazy=True) for measure_type in ('Base', 'Opponent')])
+            result_sets = [stats.raise_for_failure().result_set(0) for stats in team_stats]
+        base, opponent = result_sets
+        self.team_ids = base.column_array('TEAM_ID')
+        self.names = list(base.column('TEAM_NAME'))
+        self.win_pct = base.column_array('W_PCT').astype(numpy.float64)
+        positions = {team_id: index for index, team_id in enumerate(opponent.column('TEAM_ID'))}
+        take = numpy.array([positions[team_id] for team_id in self.team_ids.tolist()], dtype=numpy.intp)
+
+        def columns(result_set, prefix):
+            return {header: result_set.column_array(prefix + header).astype(numpy.float64)
+                    for header in ('FGM', 'FGA', 'FG3M', 'FG3A', 'FTM', 'FTA', 'OREB', 'DREB', 'TOV')}
+
+        own = columns(base, '')
+        allowed = {header: values[take] for header, values in columns(opponent, 'OPP_').items()}
+        games = base.column_array('GP').astype(numpy.float64)
+        self.offense = self.possession_rates(own, allowed['DREB'], games)
+        self.defense = self.possession_rates(allowed, own['DREB'], games)
+        self.offense['ft'] = own['FTM'] / own['FTA']
+        league = {header: own[header].sum() for header in own}
+        self.league = {rate: float(value[0]) for rate, value in self.possession_rates(
+            {header: numpy.array([total]) for header, total in league.items()}, numpy.array([league['DREB']]),
+            numpy.array([games.sum()])).items()}
+        self.rows = {IdIndex.normalize(name): index for index, name in enumerate(self.names)}
+        self.rows.update({str(team_id): index for index, team_id in enumerate(self.team_ids.tolist())})
+
+    def possession_rates(self, totals, opponent_dreb, games):
+        """How possessions end, per team
+
+        :param totals: Dict of FGM, FGA, FG3M, FG3A, FTA, OREB, TOV arrays
+        :param opponent_dreb: Defensive rebounds against those shots
+        :param games: Games played
+        :return: Dict of rate name -> array
+        """
+        possessions = totals['FGA'] + 0.44 * totals['FTA'] - totals['OREB'] + totals['TOV']
+        return {'tov': totals['TOV'] / possessions, 'ft_trip': 0.44 * totals['FTA'] / possessions,
+                'three_share': totals['FG3A'] / totals['FGA'],
+                'fg2': (totals['FGM'] - totals['FG3M']) / (totals['FGA'] - totals['FG3A']),
+                'fg3': totals['FG3M'] / totals['FG3A'],
+                'oreb': totals['OREB'] / (totals['OREB'] + opponent_dreb), 'pace': possessions / games}
+
+    def team_row(self, team):
+        """Find a team's row
+
+        :param team: Team name, part of one ("Warriors") or team ID
+        :return: The row index
+        """
+        key = IdIndex.normalize(team)
+        if key not in self.rows:
+            key = str(IdIndex.teams().get_id(team))
+        if key not in self.rows:
+            raise KeyError('{} is not in the league stats'.format(team))
+        return self.rows[key]
+
+    def matchup(self, home, away, home_edge=0.0):
+        """Probability table for one game
+
+        :param home: Home team name or ID
+        :param away: Away team name or ID
+        :param home_edge: Relative boost to the home team's shooting, e.g. 0.02 for 2%
+        :return: Dict of rate -> (home offense, away offense) pair, plus 'possessions' per team
+        """
+        home, away = self.team_row(home), self.team_row(away)
+        table = {}
+        for rate in self.rates:
+            if rate == 'pace':
+                continue
+            pair = [self.offense[rate][offense] * self.defense[rate][defense] / self.league[rate]
+                    for offense, defense in ((home, away), (away, home))]
+            table[rate] = [min(max(float(value), 0.001), 0.999) for value in pair]
+        for rate in ('fg2', 'fg3'):
+            table[rate][0] = min(table[rate][0] * (1 + home_edge), 0.999)
+        table['ft'] = [float(self.offense['ft'][home]), float(self.offense['ft'][away])]
+        table['possessions'] = float(self.offense['pace'][home] * self.offense['pace'][away] / self.league['pace'])
+        return table
+
+
+def possession_points(table, side, count, rng):
+    """Simulate `count` possessions for one side of a matchup, all at once
+
+    :param table: A matchup table from TeamTables.matchup
+    :param side: 0 for the home offense, 1 for the away offense
+    :param count: Number of possessions
+    :param rng: A numpy Generator
+    :return: An int array of points scored on each possession
+    """
+    numpy = import_numpy()
+    points = numpy.zeros(count, dtype=numpy.int8)
+    ending = rng.random(count)
+    tov, ft_trip = table['tov'][side], table['ft_trip'][side]
+    free_throws = numpy.flatnonzero((ending >= tov) & (ending < tov + ft_trip))
+    points[free_throws] = rng.binomial(2, table['ft'][side], free_throws.size)
+    live = numpy.flatnonzero(ending >= tov + ft_trip)
+    while live.size:
+        draws = rng.random((3, live.size))
+        three = draws[0] < table['three_share'][side]
+        made = draws[1] < numpy.where(three, table['fg3'][side], table['fg2'][side])
+        points[live[made]] += numpy.where(three[made], 3, 2).astype(numpy.int8)
+        missed = ~made
+        live = live[missed][draws[2][missed] < table['oreb'][side]]
+    return points
+
+
+def simulate_games(table, games, seed=None, max_overtimes=10):
+    """Simulate a batch of games between the two teams in a matchup table
+
+    :param table: A matchup table from TeamTables.matchup
+    :param games: Number of games
+    :param seed: Seed for the random draws, or None for fresh entropy
+    :param max_overtimes: Tied games go to five-minute overtimes until decided, up to this many
+    :return: (home points, away points, overtimes) arrays
+    """
+    numpy = import_numpy()
+    rng = numpy.random.default_rng(seed)
+    possessions = max(int(round(table['possessions'])), 1)
+    scores = [possession_points(table, side, games * possessions, rng).reshape(games, possessions).sum(
+        axis=1, dtype=numpy.int32) for side in (0, 1)]
+    overtimes = numpy.zeros(games, dtype=numpy.int8)
+    overtime_possessions = max(int(round(table['possessions'] * 5 / 48)), 1)
+    tied = numpy.flatnonzero(scores[0] == scores[1])
+    while tied.size and overtimes[tied[0]] < max_overtimes:
+        for side in (0, 1):
+            scores[side][tied] += possession_points(table, side, tied.size * overtime_possessions, rng).reshape(
+                tied.size, overtime_possessions).sum(axis=1, dtype=numpy.int32)
+        overtimes[tied] += 1
+        tied = tied[scores[0][tied] == scores[1][tied]]
+    return scores[0], scores[1], overtimes
+
+
+class SimulationResult:
+    """Scores from a batch of simulated games"""
+
+    def __init__(self, home, away, home_points, away_points, overtimes):
+        self.home, self.away = home, away
+        self.home_points, self.away_points, self.overtimes = home_points, away_points, overtimes
+
+    @property
+    def games(self):
+        return len(self.home_points)
+
+    @property
+    def home_win_probability(self):
+        return float((self.home_points > self.away_points).mean())
+
+    @property
+    def margins(self):
+        return self.home_points - self.away_points
+
+    def score_distribution(self, side='home'):
+        """How often each final score came up
+
+        :param side: 'home', 'away' or 'margin' (home minus away)
+        :return: A dict of score -> probability, in score order
+        """
+        numpy = import_numpy()
+        values = {'home': self.home_points, 'away': self.away_points, 'margin': self.margins}[side]
+        scores, counts = numpy.unique(values, return_counts=True)
+        return dict(zip(scores.tolist(), (counts / self.games).tolist()))
+
+    def summary(self):
+        numpy = import_numpy()
+        return {'home': self.home, 'away': self.away, 'games': self.games,
+                'home_win_probability': self.home_win_probability,
+                'home_points': float(self.home_points.mean()), 'away_points': float(self.away_points.mean()),
+                'margin_percentiles': dict(zip((5, 25, 50, 75, 95), numpy.percentile(
+                    self.margins, (5, 25, 50, 75, 95)).tolist())),
+                'overtime_rate': float((self.overtimes > 0).mean())}
+
+
+class MatchupSimulator:
+    """Monte Carlo game simulation -- thousands of games per matchup in one batch of NumPy draws, optionally spread
+    across processes for brackets and other many-matchup runs
+    """
+
+    chunk_size = 20000
+
+    def __init__(self, season='2015-16', tables=None, home_edge=0.02):
+        """Set up the simulator
+
+        :param season: Season whose team stats the probability tables are built from (cached after the first request)
+        :param tables: A TeamTables to use instead of loading one
+        :param home_edge: Relative boost to the home team's shooting
+        """
+        self.tables = tables or TeamTables(season)
+        self.home_edge = home_edge
+
+    def simulate(self, home, away, games=10000, seed=None, workers=None):
+        """Simulate one matchup
+
+        :param home: Home team name or ID
+        :param away: Away team name or ID
+        :param games: Number of games
+        :param seed: Seed for reproducible results
+        :param workers: Processes to spread the games over, or None to run in this process
+        :return: A SimulationResult
+        """
+        return self.simulate_matchups([(home, away)], games, seed, workers)[0]
+
+    def simulate_matchups(self, matchups, games=10000, seed=None, workers=None):
+        """Simulate many matchups, each in chunks of at most chunk_size games
+
+        :param matchups: (home, away) pairs
+        :param games: Games per matchup
+        :param seed: Seed for reproducible results -- each chunk gets its own independent stream
+        :param workers: Processes to spread the chunks over, or None to run in this process
+        :return: A SimulationResult per matchup, in order
+        """
+        numpy = import_numpy()
+        tables = [self.tables.matchup(home, away, self.home_edge) for home, away in matchups]
+        chunks = [(index, min(self.chunk_size, games - start)) for index in range(len(tables))
+                  for start in range(0, games, self.chunk_size)]
+        seeds = numpy.random.SeedSequence(seed).spawn(len(chunks))
+        if workers:
+            with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+                outputs = list(executor.map(simulate_games, [tables[index] for index, _ in chunks],
+                                            [size for _, size in chunks], seeds))
+        else:
+            outputs = [simulate_games(tables[index], size, chunk_seed)
+                       for (index, size), chunk_seed in zip(chunks, seeds)]
+        results = []
+        for index, (home, away) in enumerate(matchups):
+            parts = [output for (chunk_index, _), output in zip(chunks, outputs) if chunk_index == index]
+            results.append(SimulationResult(home, away, *(numpy.concatenate(arrays) for arrays in zip(*parts))))
+        return results
+
+    def simulate_bracket(self, teams, series=10000, games=2000, best_of=7, seed=None, workers=None):
+        """Simulate a knockout bracket -- adjacent teams meet, winners meet in the same order, home court goes to the
+        team with the better record
+
+        Every possible home/away game is simulated first (spread over processes if workers is given) to get game win
+        probabilities, then each series is drawn from those.
+
+        :param teams: Team names or IDs in bracket order, a power of two of them
+        :param series: Number of brackets to simulate
+        :param games: Games per possible matchup used to estimate win probabilities
+        :param best_of: Series length
+        :param seed: Seed for reproducible results
+        :param workers: Processes to spread the matchup simulations over
+        :return: A dict of team -> probability of winning the bracket, best first
+        """
+        numpy = import_numpy()
+        rows = [self.tables.team_row(team) for team in teams]
+        pairs = [(home, away) for home in range(len(teams)) for away in range(len(teams)) if home != away]
+        results = self.simulate_matchups([(teams[home], teams[away]) for home, away in pairs], games, seed, workers)
+        home_wins = numpy.zeros((len(teams), len(teams)))
+        for (home, away), result in zip(pairs, results):
+            home_wins[home, away] = result.home_win_probability
+        strength = self.tables.win_pct[rows]
+        home_games = numpy.array([True, True, False, False, True, False, True, False, True][:best_of])
+        rng = numpy.random.default_rng(seed)
+
+        alive = numpy.tile(numpy.arange(len(teams)), (series, 1))
+        while alive.shape[1] > 1:
+            first, second = alive[:, 0::2], alive[:, 1::2]
+            first_home = strength[first] >= strength[second]
+            high, low = numpy.where(first_home, first, second), numpy.where(first_home, second, first)
+            high_wins_game = numpy.where(home_games, home_wins[high[..., None], low[..., None]],
+                                         1 - home_wins[low[..., None], high[..., None]])
+            high_wins = (rng.random(high_wins_game.shape) < high_wins_game).sum(axis=2) > best_of // 2
+            alive = numpy.where(high_wins, high, low)
+        champions = numpy.bincount(alive[:, 0], minlength=len(teams)) / series
+        return dict(sorted(zip(teams, champions.tolist()), key=lambda item: -item[1]))
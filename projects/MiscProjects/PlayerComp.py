@@ -1,18 +1,22 @@
 from lib.DataGather import *
+from lib.BatchFetch import fetch_all
+from lib.ResultSet import import_numpy
 
 
 class Player:
 
     def __init__(self, name):
         self.name = name
+        self.basic_stats_obj = GeneralPlayerStats(player=self.name, lazy=True)
+        self.advanced_stats_obj = GeneralPlayerStats(self.name, MeasureType='Advanced', lazy=True)
 
     @property
     def basic_stats(self):
-        return GeneralPlayerStats(player=self.name).list[0][0]
+        return dict(self.basic_stats_obj.list[0][0])
 
     @property
     def advanced_stats(self):
-        return GeneralPlayerStats(self.name, MeasureType='Advanced').list[0][0]
+        return dict(self.advanced_stats_obj.list[0][0])
 
 
 class ComparePlayers:
@@ -78,4 +82,142 @@ class ComparePlayers:
         return stat_dict
 
 
-ComparePlayers('Stephen Curry', 'LeBron James')
+class LeagueComparison:
+    """Every player in the league as one player x stat matrix, built from a Base and an Advanced LeaguePlayerNormalStats
+    request -- compare any number of players without a request per player
+
+    Stats where lower is better (turnovers, fouls, ...) are flipped the same way change_negative_stats does it, so a
+    bigger number always wins.
+    """
+
+    id_columns = ('PLAYER_ID', 'TEAM_ID', 'AGE', 'CFID')
+    non_stats = ('GROUP_SET', 'GROUP_VALUE', 'TD3', 'CFID', 'CFPARAMS')
+    negative_stats = ('TOV', 'PF', 'DEF_RATING', 'TM_TOV_PCT')
+
+    def __init__(self, season='2015-16', measure_types=('Base', 'Advanced'), per_mode='PerGame', result_sets=None):
+        """Load the league
+
+        :param season: Season in YYYY-YY format
+        :param measure_types: The MeasureTypes to request -- their columns are joined on PLAYER_ID
+        :param per_mode: PerGame, Totals, Per36, ...
+        :param result_sets: Already-loaded leaguedashplayerstats ResultSets to use instead of requesting them
+        """
+        self.numpy = import_numpy()
+        if result_sets is None:
+            league_stats = fetch_all([LeaguePlayerNormalStats(Season=season, MeasureType=measure_type, PerMode=per_mode,
+                                                              lazy=True) for measure_type in measure_types])
+            result_sets = [stats.raise_for_failure().result_set(0) for stats in league_stats]
+        self.player_ids, self.names, self.stats, self.matrix = self.build_matrix(result_sets)
+        self.rows = {IdIndex.normalize(name): index for index, name in enumerate(self.names)}
+        self.rows.update({str(player_id): index for index, player_id in enumerate(self.player_ids)})
+        signs = self.numpy.array([-1.0 if stat in self.negative_stats else 1.0 for stat in self.stats])
+        self.signed = self.numpy.nan_to_num(self.matrix * signs, nan=-self.numpy.inf)
+
+    def build_matrix(self, result_sets):
+        """Join the result sets' stat columns into one matrix, in the first result set's player order
+
+        :param result_sets: leaguedashplayerstats ResultSets
+        :return: (player IDs, player names, stat headers, float matrix with NaN where a player has no value)
+        """
+        numpy = self.numpy
+        player_ids = result_sets[0].column_array('PLAYER_ID')
+        names = list(result_sets[0].column('PLAYER_NAME'))
+        stats, columns = [], []
+        for result_set in result_sets:
+            positions = {player_id: index for index, player_id in enumerate(result_set.column('PLAYER_ID'))}
+            take = numpy.array([positions.get(player_id, -1) for player_id in player_ids.tolist()], dtype=numpy.intp)
+            for header in result_set.numeric_headers():
+                if header in stats or header in self.id_columns or header in self.non_stats or \
+                        header.endswith('_RANK'):
+                    continue
+                values = result_set.column_array(header).astype(numpy.float64)
+                stats.append(header)
+                columns.append(numpy.where(take >= 0, values[take], numpy.nan))
+        matrix = numpy.column_stack(columns) if columns else numpy.empty((len(names), 0))
+        return player_ids, names, stats, matrix
+
+    def player_rows(self, players):
+        """Find each player's row
+
+        :param players: Names ("First Last" or "Last, First") or player IDs
+        :return: A numpy array of row indices
+        """
+        rows = []
+        for player in players:
+            keys = [key for key in IdIndex.name_forms(player) if key in self.rows]
+            key = keys[0] if keys else str(IdIndex.players().get_id(player))
+            if key not in self.rows:
+                raise KeyError('{} is not in the league stats'.format(player))
+            rows.append(self.rows[key])
+        return self.numpy.array(rows, dtype=self.numpy.intp)
+
+    def stat_columns(self, stats):
+        if stats is None:
+            return self.numpy.arange(len(self.stats))
+        return self.numpy.array([self.stats.index(stat) for stat in stats], dtype=self.numpy.intp)
+
+    def rank(self, players, stats=None):
+        """Rank players against each other in every category -- 1 is best, tied players share a rank
+
+        :param players: Names or player IDs
+        :param stats: The categories to rank, or None for all of them
+        :return: A dict of player name -> {stat: rank}, plus 'AVERAGE' -> mean rank across the categories
+        """
+        rows, columns = self.player_rows(players), self.stat_columns(stats)
+        values = self.signed[self.numpy.ix_(rows, columns)]
+        ranks = 1 + (values[None, :, :] > values[:, None, :]).sum(axis=1)
+        ranking = {}
+        for row, player_ranks in zip(rows.tolist(), ranks.tolist()):
+            ranking[self.names[row]] = dict(zip((self.stats[column] for column in columns), player_ranks))
+            ranking[self.names[row]]['AVERAGE'] = sum(player_ranks) / len(player_ranks) if player_ranks else None
+        return ranking
+
+    def win_tallies(self, players, stats=None):
+        """Head-to-head results for every pair of players
+
+        :param players: Names or player IDs
+        :param stats: The categories to count, or None for all of them
+        :return: A dict of player name -> {opponent name: categories won}
+        """
+        rows, columns = self.player_rows(players), self.stat_columns(stats)
+        values = self.signed[self.numpy.ix_(rows, columns)]
+        wins = (values[:, None, :] > values[None, :, :]).sum(axis=2)
+        return {self.names[row]: {self.names[other]: int(wins[i, j]) for j, other in enumerate(rows.tolist()) if j != i}
+                for i, row in enumerate(rows.tolist())}
+
+    def percentiles(self, players=None, stats=None):
+        """Where players sit in the league in each category -- 100 is best, ties count half
+
+        :param players: Names or player IDs, or None for every player
+        :param stats: The categories, or None for all of them
+        :return: A dict of player name -> {stat: percentile}, None where the player has no value
+        """
+        numpy = self.numpy
+        rows = self.player_rows(players) if players is not None else numpy.arange(len(self.names))
+        columns = self.stat_columns(stats)
+        percentiles = numpy.full((len(rows), len(columns)), numpy.nan)
+        for position, column in enumerate(columns.tolist()):
+            league = self.signed[:, column][~numpy.isnan(self.matrix[:, column])]
+            if not len(league):
+                continue
+            league = numpy.sort(league)
+            values = self.signed[rows, column]
+            below = numpy.searchsorted(league, values, side='left')
+            equal = numpy.searchsorted(league, values, side='right') - below
+            percentiles[:, position] = (below + equal / 2) / len(league) * 100
+            percentiles[numpy.isnan(self.matrix[rows, column]), position] = numpy.nan
+        return {self.names[row]: {self.stats[column]: (None if numpy.isnan(value) else float(value))
+                                  for column, value in zip(columns.tolist(), player_percentiles)}
+                for row, player_percentiles in zip(rows.tolist(), percentiles)}
+
+    def tally(self, players, stats=None):
+        """How many categories each player leads the group in, shared leads included
+
+        :return: A dict of player name -> categories led
+        """
+        return {name: sum(1 for stat, rank in ranks.items() if stat != 'AVERAGE' and rank == 1)
+                for name, ranks in self.rank(players, stats).items()}
+
+
+if __name__ == '__main__':
+    ComparePlayers('Stephen Curry', 'LeBron James')
@@ -1,58 +1,292 @@
 from lib.DataGather import *
-from json import dump, JSONDecodeError
+from json import dumps
 from statistics import stdev, StatisticsError
+from calendar import monthrange
+from lib.BatchFetch import fetch_all
+from lib.ResultSet import import_numpy
+from lib.Instrumentation import get_instrumentation
+from SiteData import output_formats, data_path, atomic_open, write_data_file, read_data_file, read_watermark, \
+    write_watermark
+import math
+import os
+import argparse
 import concurrent.futures
+import threading
+import time
+
+
+class OrderedStreamWriter:
+    """Writes job results to disk as they finish, in input order, holding at most max_pending results in memory
+
+    Results that finish early wait in a reorder buffer until everything before them has been written. reserve() blocks
+    the producer once max_pending results are in flight, so memory stays flat however large the job is.
+    """
+
+    def __init__(self, fp, form=True, ndjson=False, max_pending=64, output_format=None, existing=None):
+        """Open the output file -- it's written to a temporary file that replaces fp on close(), or is thrown away by
+        abort() so a run that fails partway leaves fp as it was
+
+        :param fp: Where to write -- a .gz path is gzipped
+        :param form: Pretty-print each result the way write_data_to_json_file does
+        :param ndjson: Write one compact JSON document per line instead of one JSON array
+        :param max_pending: How many results can be in flight or waiting to be written at once
+        :param output_format: One of SiteData.output_formats, instead of form and ndjson -- columnar output is kept in
+        memory and written on close()
+        :param existing: Records already in the file being extended -- written first, ahead of the job results
+        """
+        if output_format is not None:
+            form, ndjson = output_format == 'pretty', output_format == 'ndjson.gz'
+        self.fp, self.form, self.ndjson, self.output_format = fp, form, ndjson, output_format
+        self.written = 0
+        self.kept = 0
+        self.error = None
+        self.closed = False
+        self._columnar = [] if output_format == 'columnar' else None
+        self._output = atomic_open(fp, compress=str(fp).endswith('.gz')) if self._columnar is None else None
+        self._file = self._output.__enter__() if self._output else None
+        self._pending = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        if self._file and not self.ndjson:
+            self._file.write('[')
+        for item in existing or []:
+            self._write(item)
+        self.kept, self.written = self.written, 0
+
+    def reserve(self):
+        """Claim a slot in the reorder buffer before starting a job -- blocks while the buffer is full"""
+        self._slots.acquire()
+
+    def put(self, index, item):
+        """Hand in the result for the index-th job -- None means the job produced nothing and is skipped
+
+        :param index: Position of the job in the input, counting from 0
+        :param item: The JSON-serializable result
+        :return: None
+        """
+        with self._lock:
+            self._pending[index] = item
+            while self._next in self._pending:
+                item = self._pending.pop(self._next)
+                if self.error is None and not self.closed:
+                    try:
+                        self._write(item)
+                    except Exception as error:
+                        self.error = error
+                self._next += 1
+                self._slots.release()
+
+    def _write(self, item):
+        if item is None:
+            return
+        if self._columnar is not None:
+            self._columnar.append(item)
+        elif self.ndjson:
+            self._file.write(dumps(item, separators=(',', ':'), ensure_ascii=False) + '\n')
+        else:
+            separator = ',' if self.written or self.kept else ''
+            if self.form:
+                body = dumps(item, sort_keys=True, indent=4, ensure_ascii=False).replace('\n', '\n    ')
+                self._file.write('{}\n    {}'.format(separator, body))
+            else:
+                self._file.write('{}{}'.format(separator, dumps(item, separators=(',', ':'), ensure_ascii=False)))
+        self.written += 1
+
+    def close(self):
+        """Finish the output and move it over fp -- if a result couldn't be written, abort instead and raise the error
+
+        :return: None
+        """
+        with self._lock:
+            if self.closed:
+                return
+            if self.error is None:
+                self.closed = True
+                if self._columnar is not None:
+                    write_data_file(self.fp, self._columnar, 'columnar')
+                    return
+                if not self.ndjson:
+                    self._file.write('\n]' if self.form and (self.written or self.kept) else ']')
+                self._output.__exit__(None, None, None)
+                return
+        self.abort()
+        raise self.error
+
+    def abort(self, error=None):
+        """Throw the temporary file away, leaving fp as it was
+
+        :param error: The exception that stopped the run
+        :return: None
+        """
+        with self._lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.error = self.error or error or RuntimeError('Aborted')
+            self._columnar = None
+            if self._output:
+                self._output.__exit__(type(self.error), self.error, self.error.__traceback__)
 
 
 class ManageData:
+    @staticmethod
+    def stream_results(fp, items, job, workers=10, form=True, ndjson=False, max_pending=64, output_format=None,
+                       existing=None):
+        """Run job over every item on a thread pool and stream the results to fp in input order
+
+        :param fp: Where to write
+        :param items: The inputs, e.g. game IDs
+        :param job: Function taking one item and returning a JSON-serializable result, or None to skip it
+        :param workers: Number of worker threads
+        :param form: Pretty-print the output
+        :param ndjson: Write newline-delimited JSON instead of a JSON array
+        :param max_pending: Size of the reorder buffer
+        :param output_format: One of SiteData.output_formats, instead of form and ndjson
+        :param existing: Records to keep at the start of the file, e.g. what's already in it when extending it
+        :return: Number of results written, not counting existing
+        """
+        writer = OrderedStreamWriter(fp, form, ndjson, max_pending, output_format, existing)
+
+        def run(index, item):
+            result = None
+            try:
+                result = job(item)
+            except Exception as error:
+                print('Skipping {}: {!r}'.format(item, error))
+            finally:
+                writer.put(index, result)
+
+        try:
+            with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+                for index, item in enumerate(items):
+                    writer.reserve()
+                    executor.submit(run, index, item)
+        except BaseException as error:
+            writer.abort(error)
+            raise
+        writer.close()
+        return writer.written
+
+    @staticmethod
+    def date_param(game_date):
+        """Convert a GAME_DATE (YYYY-MM-DD) to the MM/DD/YYYY format DateFrom and DateTo take"""
+        year, month, day = game_date[:10].split('-')
+        return '{}/{}/{}'.format(month, day, year)
+
     @staticmethod
     def write_data_to_json_file(fp, data, form=True):
+        """Write site data atomically
+
+        :param fp: Where to write
+        :param data: The JSON-serializable data
+        :param form: True for pretty JSON, False for compact JSON, or one of SiteData.output_formats
+        :return: The path written, or None if the directory doesn't exist
+        """
+        output_format = form if form in output_formats else 'pretty' if form is True else 'compact'
         try:
-            with open(fp, 'w') as json_file:
-                try:
-                    if form:
-                        dump(data, json_file, sort_keys=True, indent=4, ensure_ascii=False)
-                    else:
-                        dump(data, json_file)
-                except JSONDecodeError:
-                    return None
+            return write_data_file(fp, data, output_format)
         except FileNotFoundError:
             return None
 
 
 class TechnicalEffects(ManageData):
-    def __init__(self, season):
+    time_after = 240
+
+    def __init__(self, season, warehouse=None, time_after=240, run=True, output_format='pretty', incremental=False):
+        """Find the technical fouls in a season's games and what the margin did after each one
+
+        :param season: Season in YYYY-YY format
+        :param warehouse: Optional SeasonWarehouse to read play-by-play from
+        :param time_after: Length of the window after each technical, in seconds
+        :param run: Process the games now -- TechnicalEffectsDriver sets this to False and runs them itself
+        :param output_format: One of SiteData.output_formats
+        :param incremental: Only process games played since the last run's watermark and merge them into the existing
+        file -- falls back to a full run when there's no watermark for this season
+        """
         self.season = season
-        self.fp = 'Data/tech_runs/{}tech_runs.json'.format(season)
-        self.list_games = GameList(season=self.season).list
-        self.write_data_to_json_file(self.fp, self.get_runs_each_game())
-
-    def get_runs_each_game(self):
-        all_games = []
-        executor = concurrent.futures.ThreadPoolExecutor(10)
-        r_list = [executor.submit(self.create_json_object, game=game, full_list=all_games) for game in self.list_games]
-        concurrent.futures.wait(r_list)
-        return all_games
-
-    def create_json_object(self, game, full_list):
-        g = Game(game, Season=self.season)
+        self.time_after = time_after
+        self.output_format = output_format
+        self.fp = data_path('Data/tech_runs/{}tech_runs.json'.format(season), output_format)
+        self.warehouse = warehouse
+        self.game_index = None
+        self.watermark = read_watermark(self.fp) if incremental and os.path.exists(self.fp) else None
+        if self.watermark and self.watermark.get('season') != season:
+            self.watermark = None
+        self.list_games = self.get_game_list()
+        self.failed_games = []
+        if run:
+            if self.watermark:
+                self.merge_new_games()
+            else:
+                self.stream_results(self.fp, self.list_games, self.tracked_json_object, output_format=output_format)
+                self.save_watermark(self.list_games)
+            get_instrumentation().print_summary()
+
+    def get_game_list(self):
+        done = set(self.watermark['games']) if self.watermark else set()
+        if self.warehouse:
+            self.warehouse.ingest([self.season])
+            return [game for game in self.warehouse.game_ids(self.season, ingested_only=True) if game not in done]
+        date_range = {'DateFrom': self.date_param(self.watermark['last_date'])} \
+            if self.watermark and self.watermark.get('last_date') else {}
+        game_list = GameList(Season=self.season, **date_range)
+        self.game_index = game_list.index
+        return [game for game in game_list.list if game not in done]
+
+    def tracked_json_object(self, game):
+        """create_json_object, noting games whose requests failed so the watermark leaves them to be tried again"""
+        try:
+            return self.create_json_object(game)
+        except FetchError:
+            self.failed_games.append(game)
+            raise
+
+    def merge_new_games(self):
+        """Process the games since the watermark and add them to the existing output
+
+        :return: Number of games added
+        """
+        added = self.stream_results(self.fp, self.list_games, self.tracked_json_object,
+                                    output_format=self.output_format, existing=read_data_file(self.fp))
+        self.save_watermark(self.list_games)
+        print('{}: added {} games'.format(self.season, added))
+        return added
+
+    def save_watermark(self, games):
+        """Record which games are in the output and the date to fetch from next time -- the date of the earliest game
+        that failed, if any did, so it's picked up again
+
+        :param games: The games this run tried to process
+        :return: None
+        """
+        failed = set(self.failed_games)
+        done = set(self.watermark['games']) if self.watermark else set()
+        done.update(game for game in games if game not in failed)
+        last_date = self.watermark.get('last_date') if self.watermark else None
+        if self.game_index is not None and self.game_index.game_ids:
+            dates = [self.game_index.info[game]['date'] for game in failed if game in self.game_index.info]
+            last_date = min(dates) if dates else max(self.game_index.by_date)
+        write_watermark(self.fp, {'season': self.season, 'last_date': last_date, 'games': sorted(done),
+                                  'updated': time.strftime('%Y-%m-%dT%H:%M:%S')})
+
+    def create_json_object(self, game, full_list=None):
+        g = self.warehouse.game(game, self.season) if self.warehouse else Game(game, Season=self.season)
+        if not self.warehouse:
+            g.raise_for_failure()
         print(game)
-        full_list.append({'game': game, 'techs': [self.get_margin_change(tech_run, g) for tech_run in
-                                                  self.get_all_tech_runs(g)]})
+        json_obj = {'game': game, 'techs': [self.get_margin_change(tech_run, g) for tech_run in
+                                            self.get_all_tech_runs(g)]}
+        if full_list is not None:
+            full_list.append(json_obj)
+        return json_obj
 
     def get_all_tech_runs(self, game_obj):
-        return [self.get_plays_after_tech(self.neutral_descriptions(game_obj.list),
-                                          [tech['PCTIMESTRING'], tech['PERIOD']]) for tech in game_obj.tech_list]
+        return [self.get_plays_after_tech(game_obj.play_index, [tech['PCTIMESTRING'], tech['PERIOD']])
+                for tech in game_obj.tech_list]
 
-    def get_plays_after_tech(self, game, tech_info, time_after=240):
-        plays_list = []
-        for item in game[0]:
-            if (item['PERIOD'] == tech_info[1]) and self.convert_time_to_seconds(tech_info[0]) >= \
-                    self.convert_time_to_seconds(item['PCTIMESTRING']) >= self.convert_time_to_seconds(tech_info[0]) - \
-                    time_after:
-                plays_list.append(item)
-
-        return plays_list
+    def get_plays_after_tech(self, play_index, tech_info, time_after=None):
+        return play_index.window(tech_info[1], tech_info[0], self.time_after if time_after is None else time_after)
 
     @staticmethod
     def get_margin_change(tech_run, game):
@@ -72,46 +306,322 @@ class TechnicalEffects(ManageData):
                                                     (int(orig_margin) * change_margin), 'original_score': orig_score,
                 'final_score': final_score, 'time_committed': tech_run[0]['PCTIMESTRING']}
 
-    @staticmethod
-    def neutral_descriptions(play_list):
-        for item in play_list[0]:
-            if not item['HOMEDESCRIPTION'] and not item['VISITORDESCRIPTION']:
-                item['NEUTRALDESCRIPTION'] = None
-            elif item['VISITORDESCRIPTION']:
-                item['NEUTRALDESCRIPTION'] = item['VISITORDESCRIPTION']
-            elif item['HOMEDESCRIPTION']:
-                item['NEUTRALDESCRIPTION'] = item['HOMEDESCRIPTION']
 
-        return play_list
+class TechnicalEffectsDriver(ManageData):
+    """Builds tech_runs files for a range of seasons on one shared thread pool
 
-    @staticmethod
-    def convert_time_to_seconds(change_time):
-        sp_time = str(change_time).split(':')
-        return (int(sp_time[0]) * 60) + int(sp_time[1])
+    Every season gets its own output file and reorder buffer, but all games share the one pool of workers, so a full
+    historical rebuild never runs more than `workers` requests at once. Games that show up in more than one season's
+    game list are only processed for the first season they appear in.
+    """
+
+    def __init__(self, seasons, workers=20, warehouse=None, time_after=240, max_pending=64, report_every=100,
+                 output_format='pretty', incremental=False):
+        """Set up the run -- call run() to start it
+
+        :param seasons: Seasons in YYYY-YY format, e.g. season_range('1996-97', '2015-16')
+        :param workers: Total worker threads across every season
+        :param warehouse: Optional SeasonWarehouse to read play-by-play from
+        :param time_after: Length of the window after each technical, in seconds
+        :param max_pending: Reorder buffer size per season
+        :param report_every: Print a progress line every this many games
+        :param output_format: One of SiteData.output_formats
+        :param incremental: Only process games since each season's watermark and add them to its existing file --
+        seasons without a watermark get a full run
+        """
+        self.seasons = list(seasons)
+        self.workers, self.warehouse, self.time_after = workers, warehouse, time_after
+        self.output_format, self.incremental = output_format, incremental
+        self.max_pending, self.report_every = max_pending, report_every
+        self.progress = {}
+        self.duplicates = {}
+        self._lock = threading.Lock()
+        self._done = 0
+        self._total = 0
+        self._started = None
+
+    def run(self):
+        """Process every season
+
+        :return: A dict of season -> progress counts (games, done, written, duplicates, seconds)
+        """
+        self._started = time.time()
+        seen_games = {}
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            for season in self.seasons:
+                effects = TechnicalEffects(season, self.warehouse, self.time_after, run=False,
+                                           output_format=self.output_format, incremental=self.incremental)
+                games = []
+                for game in effects.list_games:
+                    if game in seen_games:
+                        self.duplicates.setdefault(season, []).append(game)
+                    else:
+                        seen_games[game] = season
+                        games.append(game)
+                if self.duplicates.get(season):
+                    print('{}: skipping {} games already listed for {}'.format(
+                        season, len(self.duplicates[season]), seen_games[self.duplicates[season][0]]))
+                self.submit_season(executor, effects, games)
+        self.report()
+        get_instrumentation().print_summary()
+        return self.progress
+
+    def submit_season(self, executor, effects, games):
+        progress = {'games': len(games), 'done': 0, 'written': 0, 'duplicates': len(self.duplicates.get(
+            effects.season, [])), 'started': time.time(), 'seconds': None}
+        with self._lock:
+            self.progress[effects.season] = progress
+            self._total += len(games)
+        if not games and effects.watermark:
+            effects.save_watermark(games)
+            progress['seconds'] = 0
+            print('{}: no new games'.format(effects.season))
+            return
+        writer = OrderedStreamWriter(effects.fp, max_pending=self.max_pending, output_format=effects.output_format,
+                                     existing=read_data_file(effects.fp) if effects.watermark else None)
+        if not games:
+            writer.close()
+            effects.save_watermark(games)
+            progress['seconds'] = 0
+
+        def run(index, game):
+            result = None
+            try:
+                result = effects.tracked_json_object(game)
+            except Exception as error:
+                print('Skipping {} ({}): {!r}'.format(game, effects.season, error))
+            finally:
+                writer.put(index, result)
+                self.finish_game(effects, games, writer)
+
+        try:
+            for index, game in enumerate(games):
+                writer.reserve()
+                executor.submit(run, index, game)
+        except BaseException as error:
+            writer.abort(error)
+            raise
+
+    def finish_game(self, effects, games, writer):
+        season = effects.season
+        with self._lock:
+            progress = self.progress[season]
+            progress['done'] += 1
+            self._done += 1
+            if progress['done'] == progress['games']:
+                progress['seconds'] = time.time() - progress['started']
+                if writer.error is not None:
+                    writer.abort()
+                    print('{}: not written, kept the previous file: {!r}'.format(season, writer.error))
+                else:
+                    writer.close()
+                    effects.save_watermark(games)
+                    progress['written'] = writer.written
+                    kept = ', after {} from the last run'.format(writer.kept) if writer.kept else ''
+                    print('{}: wrote {} games{} in {:.1f}s'.format(season, writer.written, kept, progress['seconds']))
+            if self._done % self.report_every == 0:
+                self.report()
+
+    def report(self):
+        elapsed = time.time() - self._started
+        print('{}/{} games, {:.1f} games/s overall'.format(self._done, self._total,
+                                                          self._done / elapsed if elapsed else 0))
 
 
 class PlayerConsistencyInfo(ManageData):
-    def __init__(self):
+    stats = ('PTS', 'AST', 'REB')
+    log_page_size = '100000'
+
+    def __init__(self, bulk=True, season='2015-16', output_format='pretty', incremental=False):
+        """Rebuild player_consistency.json
+
+        :param bulk: Compute every player from one league-wide game log instead of one PlayerGameLogs request each
+        :param season: The season to compute consistency for
+        :param output_format: One of SiteData.output_formats
+        :param incremental: Only fetch game logs since the last bulk run's watermark and fold them into the existing
+        file, updating each player's standard deviations from running sums -- falls back to a full bulk run when there's
+        no watermark for this season
+        """
         self.player = None
         self.player_obj = None
-        self.write_data_to_json_file('Data/player_consistency.json', self.collect_player_info())
+        self.season = season
+        self.watermark = None
+        fp = data_path('Data/player_consistency.json', output_format)
+        if incremental and os.path.exists(fp):
+            self.watermark = read_watermark(fp)
+            if self.watermark and self.watermark.get('season') != season:
+                self.watermark = None
+        if incremental and self.watermark:
+            self.write_data_to_json_file(fp, self.refresh_bulk_player_info(read_data_file(fp)), output_format)
+            write_watermark(fp, self.watermark)
+        elif bulk or incremental:
+            self.write_data_to_json_file(fp, self.collect_bulk_player_info(), output_format)
+            write_watermark(fp, self.watermark)
+        else:
+            self.stream_results(data_path('Data/player_consistency.json', output_format),
+                                AllPlayersList(IsOnlyCurrentSeason='1').list[0], self.create_json_object,
+                                output_format=output_format)
+        get_instrumentation().print_summary()
 
-    def collect_player_info(self):
-        overall_obj = []
-        executor = concurrent.futures.ThreadPoolExecutor(10)
-        r_list = [executor.submit(self.create_json_object, player=player, full_list=overall_obj)
-                  for player in AllPlayersList(IsOnlyCurrentSeason='1').list[0]]
-        concurrent.futures.wait(r_list)
+    def collect_bulk_player_info(self):
+        """Build every player's consistency entry from the league-wide game log -- a handful of requests in total
 
-        return overall_obj
+        :return: The entries, in AllPlayersList order, in the same format create_json_object produces
+        """
+        players = AllPlayersList(IsOnlyCurrentSeason='1', Season=self.season, lazy=True)
+        game_log = LeagueGameLogs(PlayerOrTeam='P', Season=self.season, Sorter='DATE', Direction='DESC',
+                                  Counter=self.log_page_size, lazy=True)
+        for stat in fetch_all([players, game_log]):
+            stat.raise_for_failure()
+        result_sets = self.league_log_rows(game_log)
+        logs = self.group_logs(result_sets)
+
+        json_list, sums = [], {}
+        for player in players.list[0]:
+            player_logs, standard_dev = logs.get(player['PERSON_ID'], (None, None))
+            if player_logs:
+                sums[str(player['PERSON_ID'])] = {stat: [len(values), sum(values), sum(value * value for value in
+                                                                                       values)]
+                                                  for stat, values in player_logs.items()}
+            json_list.append({'logs': player_logs or {stat: [] for stat in self.stats},
+                              'standard_dev_logs': standard_dev or {stat: None for stat in self.stats},
+                              'name': player['DISPLAY_LAST_COMMA_FIRST'], 'team': player['TEAM_CODE']})
+        self.watermark = self.log_watermark(result_sets, sums)
+        return json_list
+
+    def refresh_bulk_player_info(self, existing):
+        """Fold the game logs since the watermark into the existing entries
+
+        New games go on the front of each player's logs (they're newest first) and into the player's running
+        (count, sum, sum of squares), which the standard deviations are recomputed from.
+
+        :param existing: The entries from the last run
+        :return: The updated entries, in AllPlayersList order
+        """
+        players = AllPlayersList(IsOnlyCurrentSeason='1', Season=self.season, lazy=True)
+        game_log = LeagueGameLogs(PlayerOrTeam='P', Season=self.season, Sorter='DATE', Direction='DESC',
+                                  Counter=self.log_page_size, DateFrom=self.date_param(self.watermark['last_date']),
+                                  lazy=True)
+        for stat in fetch_all([players, game_log]):
+            stat.raise_for_failure()
+        rows = game_log.result_set(0)
+        result_sets = [rows] if rows is not None else []
+        seen = set(self.watermark['boundary_games'])
+        new_logs = {}
+        for row in rows or []:
+            if row['GAME_DATE'] == self.watermark['last_date'] and row['GAME_ID'] in seen:
+                continue
+            player_logs = new_logs.setdefault(str(row['PLAYER_ID']), {stat: [] for stat in self.stats})
+            for stat in self.stats:
+                player_logs[stat].append(row[stat])
+
+        entries = {entry['name']: entry for entry in existing}
+        sums = self.watermark['sums']
+        json_list = []
+        for player in players.list[0]:
+            player_id, name = str(player['PERSON_ID']), player['DISPLAY_LAST_COMMA_FIRST']
+            logs = entries[name]['logs'] if name in entries else {stat: [] for stat in self.stats}
+            added = new_logs.get(player_id)
+            if added:
+                logs = {stat: added[stat] + logs[stat] for stat in self.stats}
+                player_sums = sums.setdefault(player_id, {stat: [0, 0, 0] for stat in self.stats})
+                for stat in self.stats:
+                    for value in added[stat]:
+                        player_sums[stat][0] += 1
+                        player_sums[stat][1] += value
+                        player_sums[stat][2] += value * value
+            player_sums = sums.get(player_id)
+            standard_dev = {stat: self.running_stdev(*player_sums[stat]) for stat in self.stats} \
+                if player_sums and player_sums[self.stats[0]][0] > 1 else {stat: None for stat in self.stats}
+            json_list.append({'logs': logs, 'standard_dev_logs': standard_dev, 'name': name,
+                              'team': player['TEAM_CODE']})
+        self.watermark = self.log_watermark(result_sets, sums, self.watermark)
+        return json_list
+
+    def log_watermark(self, result_sets, sums, previous=None):
+        """State for the next incremental run -- the newest game date seen, the games on that date (so they aren't
+        counted twice when DateFrom includes it again) and every player's running sums
+
+        :param result_sets: The game log ResultSets this run read
+        :param sums: PLAYER_ID -> {stat: [count, sum, sum of squares]}
+        :param previous: The watermark this run started from
+        :return: The new watermark
+        """
+        last_date = previous['last_date'] if previous else None
+        boundary = set(previous['boundary_games']) if previous else set()
+        for rows in result_sets:
+            for game_id, game_date in zip(rows.column('GAME_ID'), rows.column('GAME_DATE')):
+                if last_date is None or game_date > last_date:
+                    last_date, boundary = game_date, {game_id}
+                elif game_date == last_date:
+                    boundary.add(game_id)
+        return {'season': self.season, 'last_date': last_date, 'boundary_games': sorted(boundary), 'sums': sums,
+                'updated': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    @staticmethod
+    def running_stdev(count, total, total_squares):
+        """Sample standard deviation from a running count, sum and sum of squares"""
+        return math.sqrt(max(total_squares - total * total / count, 0) / (count - 1))
+
+    def league_log_rows(self, game_log):
+        """Get every row of the league game log, paging by month if the response was cut off at Counter rows
+
+        :param game_log: A LeagueGameLogs object for the whole season
+        :return: A list of ResultSets
+        """
+        rows = game_log.result_set(0)
+        if rows is None or len(rows) < int(game_log.params['Counter']):
+            return [rows] if rows is not None else []
+        start_year = int(self.season[:4])
+        pages = [LeagueGameLogs(PlayerOrTeam='P', Season=self.season, Sorter='DATE', Direction='DESC',
+                                Counter=self.log_page_size, lazy=True,
+                                DateFrom='{:02d}/01/{}'.format(month, year),
+                                DateTo='{:02d}/{:02d}/{}'.format(month, monthrange(year, month)[1], year))
+                 for year, month in [(start_year, month) for month in range(10, 13)] +
+                 [(start_year + 1, month) for month in range(1, 7)]]
+        return [page.raise_for_failure().result_set(0) for page in fetch_all(pages)
+                if page.result_set(0) is not None][::-1]
+
+    def group_logs(self, result_sets):
+        """Group league game log rows by player and compute each player's sample standard deviations in one pass
+
+        :param result_sets: League game log ResultSets, newest games first
+        :return: A dict of PLAYER_ID -> (logs, standard_dev_logs)
+        """
+        numpy = import_numpy()
+        result_sets = [rows for rows in result_sets if len(rows)]
+        if not result_sets:
+            return {}
+        player_ids = numpy.concatenate([rows.column_array('PLAYER_ID') for rows in result_sets])
+        values = {stat: numpy.concatenate([rows.column_array(stat) for rows in result_sets]).astype(numpy.float64)
+                  for stat in self.stats}
+        order = numpy.argsort(player_ids, kind='stable')
+        player_ids = player_ids[order]
+        values = {stat: column[order] for stat, column in values.items()}
+        unique_ids, starts, counts = numpy.unique(player_ids, return_index=True, return_counts=True)
+
+        deviations = {}
+        for stat, column in values.items():
+            means = numpy.add.reduceat(column, starts) / counts
+            squares = numpy.add.reduceat((column - numpy.repeat(means, counts)) ** 2, starts)
+            with numpy.errstate(divide='ignore', invalid='ignore'):
+                deviations[stat] = numpy.sqrt(squares / (counts - 1))
+
+        grouped = {}
+        for index, (player_id, start, count) in enumerate(zip(unique_ids.tolist(), starts, counts)):
+            logs = {stat: [int(value) if value.is_integer() else value for value in
+                           column[start:start + count].tolist()] for stat, column in values.items()}
+            standard_dev = {stat: float(deviations[stat][index]) for stat in self.stats} if count > 1 else None
+            grouped[player_id] = (logs, standard_dev)
+        return grouped
 
     @staticmethod
-    def create_json_object(player, full_list):
+    def create_json_object(player, full_list=None):
         player_name = (player['DISPLAY_LAST_COMMA_FIRST'])
-        player_obj = PlayerGameLogs(player_name)
-        log_pts = [game['PTS'] for game in player_obj.list[0]]
-        log_ast = [game['AST'] for game in player_obj.list[0]]
-        log_reb = [game['REB'] for game in player_obj.list[0]]
+        player_obj = PlayerGameLogs(player_name).raise_for_failure()
+        log_pts = list(player_obj.list[0].column('PTS'))
+        log_ast = list(player_obj.list[0].column('AST'))
+        log_reb = list(player_obj.list[0].column('REB'))
 
         try:
             standard_dev = {'PTS': stdev(log_pts), 'AST': stdev(log_ast),
@@ -122,8 +632,24 @@ class PlayerConsistencyInfo(ManageData):
         json_obj = {'logs': logs, 'standard_dev_logs': standard_dev, 'name': player_name,
                     'team': player['TEAM_CODE']}
 
-        full_list.append(json_obj)
+        if full_list is not None:
+            full_list.append(json_obj)
+        return json_obj
 
 
 if __name__ == '__main__':
-    PlayerConsistencyInfo()
+    parser = argparse.ArgumentParser(description='Rebuild the website data files')
+    parser.add_argument('job', nargs='?', default='consistency', choices=['consistency', 'tech-runs'])
+    parser.add_argument('--first', default='1996-97', help='first season for tech-runs, YYYY-YY')
+    parser.add_argument('--last', default='2015-16', help='last season for tech-runs, YYYY-YY')
+    parser.add_argument('--workers', type=int, default=20, help='requests in flight across every season')
+    parser.add_argument('--format', default='pretty', choices=output_formats, help='output format for the data files')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only fetch games since the last run and merge them into the existing data files')
+    args = parser.parse_args()
+
+    if args.job == 'tech-runs':
+        TechnicalEffectsDriver(season_range(args.first, args.last), workers=args.workers, output_format=args.format,
+                               incremental=args.incremental).run()
+    else:
+        PlayerConsistencyInfo(output_format=args.format, incremental=args.incremental)
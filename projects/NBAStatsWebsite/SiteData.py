@@ -0,0 +1,254 @@
+import gzip
+import json
+import math
+import os
+import sys
+import tempfile
+from array import array
+from contextlib import contextmanager
+
+
+output_formats = ('pretty', 'compact', 'ndjson.gz', 'columnar')
+extensions = {'pretty': '.json', 'compact': '.json', 'ndjson.gz': '.ndjson.gz', 'columnar': '.cols.gz'}
+columnar_magic = b'NBASTATS-COLUMNAR 1\n'
+
+
+def data_path(fp, output_format):
+    """Where a data file goes in a given format -- Data/player_consistency.json becomes Data/player_consistency.cols.gz
+
+    :param fp: The path of the pretty JSON version
+    :param output_format: One of output_formats
+    :return: The path as a string
+    """
+    if output_format not in extensions:
+        raise ValueError('Unknown output format {!r}, expected one of {}'.format(output_format, ', '.join(output_formats)))
+    fp = str(fp)
+    for extension in sorted(set(extensions.values()), key=len, reverse=True):
+        if fp.endswith(extension):
+            return fp[:-len(extension)] + extensions[output_format]
+    return fp + extensions[output_format]
+
+
+@contextmanager
+def atomic_open(fp, mode='w', compress=False):
+    """Open a temporary file next to fp and move it over fp only once the block finishes without an error, so readers
+    never see a half-written file
+
+    :param fp: The final path
+    :param mode: 'w' for text or 'wb' for bytes
+    :param compress: Gzip what gets written
+    """
+    fp = str(fp)
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(fp)),
+                                         prefix='.' + os.path.basename(fp) + '.', suffix='.tmp')
+    os.close(handle)
+    try:
+        os.chmod(temp_path, os.stat(fp).st_mode & 0o777 if os.path.exists(fp) else 0o644)
+        opener = gzip.open if compress else open
+        with (opener(temp_path, 'wb') if 'b' in mode else opener(temp_path, 'wt', encoding='utf-8')) as data_file:
+            yield data_file
+        os.replace(temp_path, fp)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def watermark_path(fp):
+    return str(fp) + '.watermark'
+
+
+def read_watermark(fp):
+    """Load the incremental-refresh state saved next to a data file
+
+    :param fp: The data file
+    :return: The watermark dict, or None if there isn't one
+    """
+    try:
+        with open(watermark_path(fp), 'r', encoding='utf-8') as watermark_file:
+            return json.load(watermark_file)
+    except FileNotFoundError:
+        return None
+
+
+def write_watermark(fp, watermark):
+    """Save the incremental-refresh state for a data file, atomically
+
+    :param fp: The data file
+    :param watermark: JSON-serializable state -- what was last fetched and anything needed to extend it
+    :return: None
+    """
+    with atomic_open(watermark_path(fp)) as watermark_file:
+        json.dump(watermark, watermark_file, separators=(',', ':'))
+
+
+def write_data_file(fp, data, output_format='pretty'):
+    """Write site data in one of the output formats, atomically
+
+    pretty is the indented, sorted JSON the site has always used; compact is the same JSON without whitespace;
+    ndjson.gz is one compact record per line, gzipped; columnar stores each field of a list of records as one column,
+    with numbers and lists of numbers packed as binary arrays, gzipped.
+
+    :param fp: Where to write -- use data_path to get the conventional extension
+    :param data: The JSON-serializable data
+    :param output_format: One of output_formats
+    :return: The path written
+    """
+    if output_format == 'pretty':
+        with atomic_open(fp) as data_file:
+            json.dump(data, data_file, sort_keys=True, indent=4, ensure_ascii=False)
+    elif output_format == 'compact':
+        with atomic_open(fp) as data_file:
+            json.dump(data, data_file, separators=(',', ':'), ensure_ascii=False)
+    elif output_format == 'ndjson.gz':
+        with atomic_open(fp, compress=True) as data_file:
+            for record in data:
+                data_file.write(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + '\n')
+    elif output_format == 'columnar':
+        with atomic_open(fp, 'wb') as data_file:
+            data_file.write(encode_columnar(data))
+    else:
+        raise ValueError('Unknown output format {!r}, expected one of {}'.format(output_format, ', '.join(output_formats)))
+    return fp
+
+
+def read_data_file(fp):
+    """Load a site data file written in any of the output formats -- the format is worked out from the file itself
+
+    :param fp: The file
+    :return: The data -- a list of records for ndjson.gz and columnar files
+    """
+    with open(str(fp), 'rb') as data_file:
+        raw = data_file.read()
+    if raw[:2] == b'\x1f\x8b':
+        raw = gzip.decompress(raw)
+        if raw.startswith(columnar_magic):
+            return decode_columnar(raw)
+        return [json.loads(line) for line in raw.decode('utf-8').splitlines() if line]
+    return json.loads(raw.decode('utf-8'))
+
+
+def flatten(record, prefix=()):
+    """(path, value) pairs for the leaves of a record -- nested non-empty dicts are walked into"""
+    for key, value in record.items():
+        if isinstance(value, dict) and value:
+            yield from flatten(value, prefix + (key,))
+        else:
+            yield prefix + (key,), value
+
+
+def column_kind(values):
+    """How a column can be packed
+
+    :return: 'int', 'float', 'ragged-int', 'ragged-float' or 'json' -- only kinds that read back exactly are used
+    """
+    def kind_of(items, allow_none):
+        if all(type(item) is int and -2 ** 63 <= item < 2 ** 63 for item in items):
+            return 'int'
+        if all((item is None and allow_none) or (type(item) is float and not math.isnan(item)) for item in items) and \
+                any(item is not None for item in items):
+            return 'float'
+        return None
+
+    if not values:
+        return 'json'
+    if all(type(value) is list for value in values):
+        kind = kind_of([item for value in values for item in value], False)
+        return 'ragged-' + kind if kind else 'json'
+    return kind_of(values, True) or 'json'
+
+
+def pack(items, typecode):
+    packed = array(typecode, items)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack(blob, typecode):
+    unpacked = array(typecode)
+    unpacked.frombytes(blob)
+    if sys.byteorder == 'big':
+        unpacked.byteswap()
+    return unpacked.tolist()
+
+
+def encode_columnar(data):
+    """Pack a list of same-shaped records column by column
+
+    Data that isn't a list of records with the same fields is stored whole as one JSON blob, so any data round-trips.
+
+    :param data: The site data
+    :return: The gzipped file contents
+    """
+    paths = None
+    if isinstance(data, list) and data and all(isinstance(record, dict) for record in data):
+        paths = [path for path, _ in flatten(data[0])]
+        if any(sorted(path for path, _ in flatten(record)) != sorted(paths) for record in data):
+            paths = None
+    columns, blobs = [], []
+    if paths is None:
+        blob = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        columns.append({'path': None, 'kind': 'json', 'sizes': [len(blob)]})
+        blobs.append(blob)
+    else:
+        leaves = [dict(flatten(record)) for record in data]
+        for path in paths:
+            values = [leaf[path] for leaf in leaves]
+            kind = column_kind(values)
+            if kind == 'int':
+                parts = [pack(values, 'q')]
+            elif kind == 'float':
+                parts = [pack([math.nan if value is None else value for value in values], 'd')]
+            elif kind.startswith('ragged-'):
+                offsets = [0]
+                for value in values:
+                    offsets.append(offsets[-1] + len(value))
+                parts = [pack(offsets, 'q'), pack([item for value in values for item in value],
+                                                  'q' if kind == 'ragged-int' else 'd')]
+            else:
+                parts = [json.dumps(values, separators=(',', ':'), ensure_ascii=False).encode('utf-8')]
+            columns.append({'path': list(path), 'kind': kind, 'sizes': [len(part) for part in parts]})
+            blobs.extend(parts)
+    header = json.dumps({'rows': len(data) if paths is not None else None, 'columns': columns},
+                        separators=(',', ':')).encode('utf-8')
+    return gzip.compress(columnar_magic + header + b'\n' + b''.join(blobs))
+
+
+def decode_columnar(raw):
+    """Rebuild the records from an uncompressed columnar file
+
+    :param raw: The decompressed file contents
+    :return: The data
+    """
+    header_end = raw.index(b'\n', len(columnar_magic))
+    header = json.loads(raw[len(columnar_magic):header_end].decode('utf-8'))
+    position = header_end + 1
+    columns = []
+    for column in header['columns']:
+        parts = []
+        for size in column['sizes']:
+            parts.append(raw[position:position + size])
+            position += size
+        kind = column['kind']
+        if kind == 'json':
+            values = json.loads(parts[0].decode('utf-8'))
+        elif kind == 'int':
+            values = unpack(parts[0], 'q')
+        elif kind == 'float':
+            values = [None if math.isnan(value) else value for value in unpack(parts[0], 'd')]
+        else:
+            offsets = unpack(parts[0], 'q')
+            items = unpack(parts[1], 'q' if kind == 'ragged-int' else 'd')
+            values = [items[start:end] for start, end in zip(offsets, offsets[1:])]
+        if column['path'] is None:
+            return values
+        columns.append((column['path'], values))
+
+    records = [{} for _ in range(header['rows'])]
+    for path, values in columns:
+        for record, value in zip(records, values):
+            for key in path[:-1]:
+                record = record.setdefault(key, {})
+            record[path[-1]] = value
+    return records